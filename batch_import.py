@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+
+import argparse
+import sys
+
+from hugo_import.batch import print_summaries, run_batch
+from hugo_import.cli import add_dry_run
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run several conventions' imports at once, as listed in a batch file.")
+    parser.add_argument('batch', nargs='?', default='batch.ini', help='batch file (default: batch.ini)')
+    parser.add_argument('--workers', type=int, help='number of imports to run at once')
+    parser.add_argument('--debug', action='store_true', default=None,
+                        help='print every grouped ballot as it is processed')
+    add_dry_run(parser)
+    args = parser.parse_args()
+    summaries = run_batch(args.batch, args.workers, args.dry_run, args.debug)
+    print_summaries(summaries)
+    if any(summary['status'] != 'ok' for summary in summaries):
+        sys.exit(1)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+# Compares the per-key SELECT-then-INSERT strategy of HugoTranslator.copy_nominations with the
+# set-based bulk strategy against a local PostgreSQL stand-in for kansa.
+#
+#   python benchmarks/bench_copy_nominations.py [config.ini] [scale]
+#
+# The [benchmark_db] section of the config must point at a scratch database: its hugo.nominations
+# table is created if missing and truncated between runs.
+
+import os
+import sys
+import time
+
+import psycopg2 as dbm
+from psycopg2.extensions import cursor as base_cursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hugo_import.db import connection_args  # noqa: E402
+from hugo_import.nominations_file import NominationsFileTranslator  # noqa: E402
+from synthetic import KANSA_SCHEMA  # noqa: E402
+
+
+class CountingCursor(base_cursor):
+    statements = 0
+
+    def execute(self, query, vars=None):
+        CountingCursor.statements += 1
+        return super().execute(query, vars)
+
+
+def load_nominations(filename, scale):
+    translator = NominationsFileTranslator()
+    rows = list(translator.read_nominations(filename))
+    # Each copy gets its own membership numbers so that the keys stay distinct
+    return translator.group_nominations(
+        row[:3] + (int(row[3]) + copy * 100000,) + row[4:] for copy in range(scale) for row in rows
+    )
+
+
+def run(strategy, nominations_list):
+    CountingCursor.statements = 0
+    start = time.perf_counter()
+    additions = strategy(nominations_list)
+    elapsed = time.perf_counter() - start
+    return additions, elapsed, CountingCursor.statements
+
+
+def main():
+    config_filename = sys.argv[1] if len(sys.argv) > 1 else 'config.ini'
+    scale = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    translator = NominationsFileTranslator()
+    translator.read_config(config_filename)
+    params = translator.config['benchmark_db']
+    translator.dbconn = dbm.connect(**connection_args(params))
+    translator.dbconn.cursor_factory = CountingCursor
+    with translator.dbconn.cursor() as cursor:
+        cursor.execute(KANSA_SCHEMA)
+    translator.dbconn.commit()
+
+    csv_filename = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nominations.csv')
+    nominations_list = load_nominations(csv_filename, scale)
+    print(f'{len(nominations_list)} grouped keys from nominations.csv x{scale}')
+
+    strategies = (
+        ('row', translator.insert_nominations_by_row),
+        ('bulk', translator.insert_nominations_bulk),
+    )
+    print(f"{'strategy':<8} {'phase':<8} {'added':>8} {'seconds':>9} {'statements':>11}")
+    for name, strategy in strategies:
+        with translator.dbconn.cursor() as cursor:
+            cursor.execute('TRUNCATE hugo.nominations')
+        translator.dbconn.commit()
+        for phase in ('empty', 'rerun'):
+            additions, elapsed, statements = run(strategy, nominations_list)
+            print(f'{name:<8} {phase:<8} {additions:>8} {elapsed:>9.3f} {statements:>11}')
+
+
+if __name__ == '__main__':
+    main()
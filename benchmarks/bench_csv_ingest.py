@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+# Compares the csv module, pandas and parallel chunked ingestion engines on nominations.csv
+# replicated to [rows] rows (default 2,000,000), the parallel engine with 1, 2, 4, ... up to
+# [processes] worker processes (default: one per CPU). Only reading and grouping are timed;
+# nothing is written to kansa.
+#
+#   python benchmarks/bench_csv_ingest.py [rows] [processes]
+
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hugo_import import chunked, columnar  # noqa: E402
+from hugo_import.nominations_file import NominationsFileTranslator  # noqa: E402
+
+CSV_FILENAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nominations.csv')
+
+
+def replicate(filename, target_rows):
+    with open(CSV_FILENAME, 'r') as fh:
+        reader = csv.reader(fh)
+        header = next(reader)
+        rows = list(reader)
+    with open(filename, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(header)
+        written = 0
+        copy = 0
+        while written < target_rows:
+            for row in rows[:target_rows - written]:
+                # Each copy gets its own membership numbers so that the keys stay distinct
+                writer.writerow(row[:8] + [str(int(row[8]) + copy * 100000)] + row[9:])
+            written += min(len(rows), target_rows - written)
+            copy += 1
+
+
+def main():
+    target_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    max_processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    translator = NominationsFileTranslator()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'nominations.csv')
+        replicate(filename, target_rows)
+        print(f'nominations.csv replicated to {target_rows} rows ({os.path.getsize(filename) / 2 ** 20:.0f} MiB)')
+        engines = [('csv', lambda: translator.group_nominations(translator.read_nominations(filename)))]
+        if columnar.available():
+            engines.append(('pandas', lambda: columnar.group_nominations(translator.categories, filename)))
+        else:
+            print('pandas is not installed: not timing the pandas engine.')
+        processes = 1
+        while processes <= max_processes:
+            engines.append((f'parallel/{processes}', lambda processes=processes: chunked.group_nominations(
+                translator.categories, filename, processes)[0]))
+            processes *= 2
+        print(f"{'engine':<11} {'keys':>9} {'seconds':>9} {'rows/s':>11}")
+        for name, group in engines:
+            start = time.perf_counter()
+            nominations_list = group()
+            elapsed = time.perf_counter() - start
+            print(f'{name:<11} {len(nominations_list):>9} {elapsed:>9.2f} {target_rows / elapsed:>11.0f}')
+            del nominations_list
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# Measures the memory and time taken to group nominations.csv, replicated [scale] times
+# (default 100), with the original dict-per-nomination structure and with NominationGroup.
+#
+#   python benchmarks/bench_grouping.py [scale]
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hugo_import.nominations_file import NominationsFileTranslator  # noqa: E402
+
+CSV_FILENAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nominations.csv')
+
+
+def scaled_rows(translator, scale):
+    # Re-read the file for every copy so that each row brings its own freshly allocated strings,
+    # as it would from a real export; each copy gets its own membership numbers.
+    for copy in range(scale):
+        for row in translator.read_nominations(CSV_FILENAME):
+            yield row[:3] + (str(int(row[3]) + copy * 100000),) + row[4:]
+
+
+def group_as_dicts(translator, rows):
+    # The grouping structure used before NominationGroup
+    categories = translator.categories
+    nominations_list = {}
+    for row in rows:
+        category, current_ts, current_ip, membership_id, first_name, last_name, \
+            nominations_field_1, nominations_field_2, nominations_field_3 = row
+        category = categories[category]
+        category_fields = category.fields
+        nominations_key = (current_ts or '1970-01-01 00:00:00', current_ip, membership_id, first_name, last_name,
+                           category.code)
+        nomination = {
+            category_fields[0]: nominations_field_1,
+            category_fields[1]: nominations_field_2,
+            category_fields[2]: nominations_field_3,
+        }
+        if nominations_key in nominations_list:
+            nominations_list[nominations_key].append(nomination)
+        else:
+            nominations_list[nominations_key] = [nomination]
+    return nominations_list
+
+
+def measure(name, group, translator, scale):
+    gc.collect()
+    collections = sum(stats['collections'] for stats in gc.get_stats())
+    tracemalloc.start()
+    start = time.perf_counter()
+    nominations_list = group(translator, scaled_rows(translator, scale))
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    collections = sum(stats['collections'] for stats in gc.get_stats()) - collections
+    print(f'{name:<10} {len(nominations_list):>9} {retained / 2 ** 20:>12.1f} {peak / 2 ** 20:>9.1f} '
+          f'{collections:>6} {elapsed:>9.2f}')
+    del nominations_list
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    translator = NominationsFileTranslator()
+    print(f'nominations.csv x{scale}')
+    print(f"{'structure':<10} {'keys':>9} {'retained MiB':>12} {'peak MiB':>9} {'gc':>6} {'seconds':>9}")
+    measure('dicts', group_as_dicts, translator, scale)
+    measure('groups', NominationsFileTranslator.group_nominations, translator, scale)
+
+
+if __name__ == '__main__':
+    main()
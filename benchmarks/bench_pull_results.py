@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+# Times pull_results_json against the local results stand-in, fetching the categories one at a
+# time and all at once. The stand-in waits [delay] seconds (default 0.2) before each response.
+#
+#   python benchmarks/bench_pull_results.py [delay]
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from results_server import start_server  # noqa: E402
+from pull_results_json import categories, pull_results  # noqa: E402
+
+
+def main():
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    server = start_server(delay=delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    print(f'{len(categories)} categories, {delay}s server delay')
+    print(f"{'workers':>7} {'seconds':>9}")
+    for workers in (1, len(categories)):
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            pull_results(base_url, 'hugo-admin@example.com', 'key', output_dir, workers)
+            elapsed = time.perf_counter() - start
+        print(f'{workers:>7} {elapsed:>9.2f}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+# Times render_results against the original results_from_json algorithm on synthetic elections
+# with [finalists] finalists (default 1000), counting the first [places] places (default 3).
+#
+#   python benchmarks/bench_render_results.py [finalists] [places]
+
+import csv
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hugo_import.results import write_results  # noqa: E402
+from synthetic import synthetic_results  # noqa: E402
+
+
+def write_results_quadratic(vote_data, filehandle):
+    # The original script: list membership tests and a fixed six-round layout
+    finalists = []
+    vote_rows = []
+    for count in vote_data:
+        for round in count['rounds']:
+            for tally_item in round['tally']:
+                if tally_item['finalist'] not in finalists:
+                    finalists.append(tally_item['finalist'])
+    for count in vote_data:
+        vote_matrix = {}
+        ranked_finalists = {}
+        for round in count['rounds']:
+            for tally_item in round['tally']:
+                vote_matrix.setdefault(tally_item['finalist'], []).append(tally_item['votes'])
+        for finalist in finalists:
+            if finalist in vote_matrix:
+                ranked_finalists[finalist] = len(vote_matrix[finalist]) + (finalist == count['winner'])
+        ranking = sorted(ranked_finalists.items(), key=lambda finalist: finalist[1], reverse=True)
+        for finalist in [x[0] for x in ranking]:
+            vote_rows.append([count['place'], finalist] + vote_matrix[finalist])
+        vote_rows.append(('',) * 9)
+    csv.writer(filehandle).writerows(vote_rows)
+
+
+def main():
+    finalists = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    places = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    vote_data = synthetic_results('Synthetic', finalists=finalists, ballots=10 * finalists, places=places)
+    tally_items = sum(len(round['tally']) for count in vote_data for round in count['rounds'])
+    rounds = max(len(count['rounds']) for count in vote_data)
+    print(f'{finalists} finalists, {len(vote_data)} places, up to {rounds} rounds, {tally_items} tally items')
+    print(f"{'renderer':<10} {'seconds':>9}")
+    for name, render in (('quadratic', write_results_quadratic), ('linear', write_results)):
+        start = time.perf_counter()
+        render(vote_data, io.StringIO())
+        print(f'{name:<10} {time.perf_counter() - start:>9.3f}')
+
+
+if __name__ == '__main__':
+    main()
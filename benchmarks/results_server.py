@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+# A local stand-in for the kansa admin API used by pull_results_json.py, for the pull benchmark
+# and tests/test_pull_results.py alike. It answers the login request with a session cookie and
+# serves a canned count for every /api/hugo/admin/votes/{category}, randomly generated unless the
+# caller supplies its own, optionally after a delay to mimic a remote server.
+#
+#   python benchmarks/results_server.py [port] [delay seconds]
+
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+VOTES_PATH = '/api/hugo/admin/votes/'
+
+
+class ResultsHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    # Set for each server by start_server: category to count, and the counts served so far
+    results = None
+    payloads = None
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/api/login':
+            self.send_json({'status': 'success'}, cookie='kansa=stand-in')
+        elif path.startswith(VOTES_PATH) and 'kansa=stand-in' in self.headers.get('Cookie', ''):
+            time.sleep(self.delay)
+            category = path[len(VOTES_PATH):]
+            if category not in self.payloads:
+                self.payloads[category] = self.results(category)
+            self.send_json(self.payloads[category])
+        else:
+            self.send_error(404)
+
+    def send_json(self, payload, cookie=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if cookie:
+            self.send_header('Set-Cookie', f'{cookie}; Path=/')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, delay=0.0, results=None):
+    # results(category) gives the count served for a category: synthetic_results by default
+    if results is None:
+        from synthetic import synthetic_results as results
+    handler = type('ResultsHandler', (ResultsHandler,), {
+        'delay': delay, 'results': staticmethod(results), 'payloads': {},
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    server = start_server(int(sys.argv[1]) if len(sys.argv) > 1 else 8000,
+                          float(sys.argv[2]) if len(sys.argv) > 2 else 0.0)
+    print(f'Serving kansa results on http://127.0.0.1:{server.server_address[1]}')
+    server.serve_forever()
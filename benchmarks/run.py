@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+
+# Runs every import path against seeded synthetic data and compares the results with stored
+# baselines: the nominations and votes CSV imports and the Discon3 copy against the scratch
+# database in [benchmark_db], and results_from_json's rendering in memory.
+#
+#   python benchmarks/run.py [--config config.ini] [--members 2000] [--categories 8] [--entries 200]
+#                            [--engine csv] [--case nominations_file ...] [--save]
+#
+# Each case runs in its own process so that its peak memory is its own. Rows per second, peak
+# memory and the number of queries per stage are printed and checked against baselines.json for
+# the same scale and engine. The run fails if throughput drops or memory grows by more than --tolerance, or
+# if any stage issues more queries than before. --save records the current figures as the
+# baselines instead. Timings depend on the machine, so save baselines where they will be checked.
+
+import argparse
+import configparser
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import psycopg2 as dbm
+from psycopg2.extensions import cursor as base_cursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic  # noqa: E402
+from hugo_import.db import connection_args  # noqa: E402
+from hugo_import.discon import DisconTranslator  # noqa: E402
+from hugo_import.nominations_file import NominationsFileTranslator  # noqa: E402
+from hugo_import.results import write_results  # noqa: E402
+from hugo_import.stats import ImportStats  # noqa: E402
+from hugo_import.votes_file import VotesFileTranslator  # noqa: E402
+
+BASELINES_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+CASES = ('nominations_file', 'votes_file', 'discon_copy', 'results_json')
+
+
+class CountingCursor(base_cursor):
+    # Counts every statement against the stage that issued it
+    stats = None
+
+    def execute(self, query, vars=None):
+        CountingCursor.stats.count(f'queries.{CountingCursor.stats.current_stage() or "other"}')
+        return super().execute(query, vars)
+
+    def copy_expert(self, sql, file, size=8192):
+        CountingCursor.stats.count(f'queries.{CountingCursor.stats.current_stage() or "other"}')
+        return super().copy_expert(sql, file, size)
+
+
+def connect(params, search_path=None):
+    if search_path is None:
+        return dbm.connect(**connection_args(params))
+    return dbm.connect(**connection_args(params), options=f'-c search_path={search_path}')
+
+
+def benchmark_config(config_filename, fixtures, stats_filename, engine='csv'):
+    # The importers' own config, pointed at the scratch database and the synthetic fixtures, with
+    # every option that chooses a code path or changes the work done pinned, so that a developer's
+    # config.ini can't change what is measured against the baselines
+    config = configparser.ConfigParser()
+    config.read(config_filename)
+    for section in ('kansa_db', 'discon3_db', 'file', 'snapshot', 'import', 'sync', 'canonical'):
+        if not config.has_section(section):
+            config.add_section(section)
+    for section in ('kansa_db', 'discon3_db'):
+        config[section].update(config['benchmark_db'])
+    config['kansa_db'].update({
+        'bulk_insert': 'yes', 'batch_size': '1000', 'workers': '1', 'pipeline': 'no', 'content_hash': 'no',
+    })
+    config['discon3_db']['itersize'] = '2000'
+    config['file'].update({
+        'nominations_filename': os.path.join(fixtures, 'nominations.csv'),
+        'votes_filename': os.path.join(fixtures, 'votes.csv'),
+        'engine': engine,
+        'processes': '0',
+        'stream_votes': 'no',
+        'sort_rows': '100000',
+        'finalists_filename': '',
+    })
+    config['snapshot']['enabled'] = 'no'
+    config['import'].update({'categories': '', 'debug': 'no', 'stats_file': stats_filename})
+    config['sync']['incremental'] = 'no'
+    config['canonical']['enabled'] = 'no'
+    return config
+
+
+def truncate(config, tables):
+    dbconn = connect(config['benchmark_db'])
+    with dbconn.cursor() as cursor:
+        cursor.execute(synthetic.KANSA_SCHEMA)
+        cursor.execute(f'TRUNCATE {tables}')
+    dbconn.commit()
+    dbconn.close()
+
+
+def run_case(case, config_filename, fixtures, stats_filename, engine='csv'):
+    # Runs in the child process: one import, whose summary is appended to stats_filename
+    config = benchmark_config(config_filename, fixtures, stats_filename, engine)
+    if case == 'results_json':
+        stats = ImportStats(case)
+        with open(os.path.join(fixtures, 'results.json')) as fh:
+            results = json.load(fh)
+        with stats.stage('render'):
+            for vote_data in results.values():
+                write_results(vote_data, io.StringIO())
+        stats.count('rows', sum(len(round['tally']) for vote_data in results.values()
+                                for count in vote_data for round in count['rounds']))
+        stats.report(stats_filename)
+        return
+    if case == 'votes_file':
+        truncate(config, 'hugo.votes, hugo.finalists')
+        translator = VotesFileTranslator()
+    else:
+        truncate(config, 'hugo.nominations')
+        translator = DisconTranslator() if case == 'discon_copy' else NominationsFileTranslator()
+    translator.config = config
+    CountingCursor.stats = translator.stats
+    translator.connect_db()
+    translator.dbconn.cursor_factory = CountingCursor
+    if case == 'discon_copy':
+        translator.discon_dbconn = connect(config['discon3_db'], synthetic.DISCON_SEARCH_PATH)
+        translator.discon_dbconn.cursor_factory = CountingCursor
+        translator.copy_nominations()
+    else:
+        translator.import_file()
+
+
+def generate(config, fixtures, members, categories, entries, seed):
+    rows = synthetic.write_csv(os.path.join(fixtures, 'nominations.csv'), synthetic.NOMINATIONS_HEADER,
+                               synthetic.nominations_rows(members, categories, entries, seed))
+    votes = synthetic.write_csv(os.path.join(fixtures, 'votes.csv'), synthetic.VOTES_HEADER,
+                                synthetic.votes_rows(members, categories, seed=seed))
+    with open(os.path.join(fixtures, 'results.json'), 'w') as fh:
+        json.dump({
+            category.code: synthetic.synthetic_results(category.code, finalists=entries, ballots=members,
+                                                       seed=seed, places=6)
+            for category in list(synthetic.CATEGORIES)[:categories]
+        }, fh)
+    dbconn = connect(config['benchmark_db'])
+    synthetic.seed_discon(dbconn, synthetic.nominations_rows(members, categories, entries, seed))
+    dbconn.close()
+    print(f'{rows} nomination rows, {votes} vote rows, {members} members x {categories} categories')
+
+
+def measure(case, config_filename, fixtures, engine):
+    stats_filename = os.path.join(fixtures, f'{case}.jsonl')
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--config', config_filename, '--fixtures', fixtures,
+         '--engine', engine, '--child', case],
+        check=True, stdout=subprocess.DEVNULL)
+    with open(stats_filename) as fh:
+        summary = json.loads(fh.readlines()[-1])
+    counters = summary['counters']
+    return {
+        'rows': counters.get('rows', 0),
+        'seconds': summary['seconds'],
+        'rows_per_second': round(counters.get('rows', 0) / summary['seconds']),
+        'peak_rss_mib': summary['peak_rss_mib'],
+        'queries': {
+            counter[len('queries.'):]: n for counter, n in sorted(counters.items()) if counter.startswith('queries.')
+        },
+    }
+
+
+def regressions(case, result, baseline, tolerance):
+    if baseline is None:
+        return []
+    found = []
+    if result['rows_per_second'] < baseline['rows_per_second'] * (1 - tolerance):
+        found.append(f"{case}: {result['rows_per_second']} rows/s, baseline {baseline['rows_per_second']}")
+    if result['peak_rss_mib'] > baseline['peak_rss_mib'] * (1 + tolerance):
+        found.append(f"{case}: peak {result['peak_rss_mib']} MiB, baseline {baseline['peak_rss_mib']}")
+    for stage, queries in result['queries'].items():
+        if queries > baseline['queries'].get(stage, 0):
+            found.append(f"{case}: {queries} queries in {stage}, baseline {baseline['queries'].get(stage, 0)}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every import path on synthetic data.')
+    parser.add_argument('--config', default='config.ini', help='configuration file with a [benchmark_db] section')
+    parser.add_argument('--members', type=int, default=2000)
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--entries', type=int, default=200, help='distinct entries nominated per category')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=('csv', 'pandas', 'parallel'), default='csv',
+                        help='CSV ingestion engine for the file imports (default csv)')
+    parser.add_argument('--case', action='append', choices=CASES, help='only run these cases')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed fractional drop in rows/s or growth in peak memory (default 0.25)')
+    parser.add_argument('--baselines', default=BASELINES_FILENAME)
+    parser.add_argument('--save', action='store_true', help='record these results as the baselines')
+    parser.add_argument('--fixtures', help=argparse.SUPPRESS)
+    parser.add_argument('--child', choices=CASES + ('generate',), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    config_filename = os.path.abspath(args.config)
+    if args.child == 'generate':
+        config = configparser.ConfigParser()
+        config.read(config_filename)
+        generate(config, args.fixtures, args.members, args.categories, args.entries, args.seed)
+        return
+    if args.child:
+        run_case(args.child, config_filename, args.fixtures, os.path.join(args.fixtures, f'{args.child}.jsonl'),
+                 args.engine)
+        return
+
+    scale = f'{args.members}x{args.categories}x{args.entries}/{args.seed}/{args.engine}'
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as fh:
+            baselines = json.load(fh)
+    results = {}
+    with tempfile.TemporaryDirectory() as fixtures:
+        # Generated in a child process too: Linux carries a process's peak RSS over into the
+        # children it starts, so the parent has to stay small for theirs to mean anything
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--config', config_filename, '--fixtures', fixtures,
+             '--members', str(args.members), '--categories', str(args.categories), '--entries', str(args.entries),
+             '--seed', str(args.seed), '--child', 'generate'],
+            check=True)
+        print(f"{'case':<17} {'rows':>8} {'seconds':>8} {'rows/s':>9} {'peak MiB':>9}  queries")
+        for case in args.case or CASES:
+            result = results[case] = measure(case, config_filename, fixtures, args.engine)
+            queries = ', '.join(f'{stage} {n}' for stage, n in result['queries'].items())
+            print(f"{case:<17} {result['rows']:>8} {result['seconds']:>8.3f} {result['rows_per_second']:>9} "
+                  f"{result['peak_rss_mib']:>9.1f}  {queries}")
+
+    if args.save:
+        baselines.setdefault(scale, {}).update(results)
+        with open(args.baselines, 'w') as fh:
+            json.dump(baselines, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+        print(f'Saved baselines for {scale} to {args.baselines}.')
+        return
+    if scale not in baselines:
+        print(f'No baselines for {scale}: run with --save to record them.')
+        return
+    found = [
+        regression for case, result in results.items()
+        for regression in regressions(case, result, baselines[scale].get(case), args.tolerance)
+    ]
+    for regression in found:
+        print(f'REGRESSION {regression}')
+    if found:
+        sys.exit(1)
+    print(f'No regressions against the {scale} baselines.')
+
+
+if __name__ == '__main__':
+    main()
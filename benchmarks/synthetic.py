@@ -0,0 +1,229 @@
+# Seeded synthetic fixtures for the benchmarks: nominations and votes CSVs in the Discon3 export
+# layouts, kansa-shaped results JSON, and the Discon3 and kansa tables the importers read and
+# write. The same arguments and seed always produce the same data.
+
+import csv
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hugo_import import CATEGORIES  # noqa: E402
+
+NOMINATIONS_HEADER = (
+    'users.current_sign_in_ip', 'users.last_sign_in_ip', 'users.current_sign_in_at', 'users.last_sign_in_at',
+    'contact.updated_at', 'users.created_at', 'contact.created_at', 'nominations.created_at',
+    'reservations.membership_number', 'users.email', 'users.sign_in_count', 'contact.preferred_first_name',
+    'contact.preferred_last_name', 'contact.title', 'contact.first_name', 'contact.last_name', 'categories.name',
+    'nominations.field_1', 'nominations.field_2', 'nominations.field_3',
+)
+
+VOTES_HEADER = (
+    'users.current_sign_in_ip', 'users.last_sign_in_ip', 'users.current_sign_in_at', 'users.last_sign_in_at',
+    'contact.updated_at', 'users.created_at', 'contact.created_at', 'ranks.created_at',
+    'reservations.membership_number', 'users.email', 'contact.preferred_first_name', 'contact.preferred_last_name',
+    'contact.title', 'contact.first_name', 'contact.last_name', 'categories.name', 'finalists.description',
+    'ranks.position',
+)
+
+KANSA_SCHEMA = """
+CREATE SCHEMA IF NOT EXISTS hugo;
+CREATE TABLE IF NOT EXISTS hugo.nominations (
+    id SERIAL PRIMARY KEY,
+    time timestamptz NOT NULL DEFAULT now(),
+    client_ip text NOT NULL,
+    client_ua text,
+    person_id integer NOT NULL,
+    signature text NOT NULL,
+    competition text NOT NULL,
+    category text NOT NULL,
+    nominations jsonb[] NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hugo.votes (
+    id SERIAL PRIMARY KEY,
+    time timestamptz NOT NULL DEFAULT now(),
+    client_ip text NOT NULL,
+    client_ua text,
+    person_id integer NOT NULL,
+    signature text NOT NULL,
+    competition text NOT NULL,
+    category text NOT NULL,
+    votes integer[] NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hugo.finalists (
+    id SERIAL PRIMARY KEY,
+    competition text NOT NULL,
+    category text NOT NULL,
+    sortindex integer,
+    title text NOT NULL,
+    subtitle text
+);
+"""
+
+# The Discon3 tables live in a schema of their own, so that a role named hugo, whose default search
+# path starts with the hugo schema, doesn't create them beside kansa's. Connections that read or
+# write them set their search path to it.
+DISCON_SEARCH_PATH = 'discon3'
+
+# The tables and columns of the Discon3 database that NOMINATIONS_QUERY joins
+DISCON_SCHEMA = f"""
+CREATE SCHEMA IF NOT EXISTS {DISCON_SEARCH_PATH};
+SET search_path TO {DISCON_SEARCH_PATH};
+DROP TABLE IF EXISTS nominations, categories, reservations, claims, users, dc_contacts;
+CREATE TABLE categories (id SERIAL PRIMARY KEY, name text);
+CREATE TABLE reservations (id SERIAL PRIMARY KEY, membership_number integer);
+CREATE TABLE users (
+    id SERIAL PRIMARY KEY, current_sign_in_ip inet, last_sign_in_ip inet, current_sign_in_at timestamp,
+    last_sign_in_at timestamp, created_at timestamp, email text, sign_in_count integer
+);
+CREATE TABLE claims (id SERIAL PRIMARY KEY, reservation_id integer, user_id integer, active_to timestamp);
+CREATE TABLE dc_contacts (
+    id SERIAL PRIMARY KEY, claim_id integer, updated_at timestamp, created_at timestamp,
+    preferred_first_name text, preferred_last_name text, title text, first_name text, last_name text
+);
+CREATE TABLE nominations (
+    id SERIAL PRIMARY KEY, category_id integer, reservation_id integer, created_at timestamp,
+    field_1 text, field_2 text, field_3 text
+);
+CREATE INDEX ON claims (reservation_id);
+CREATE INDEX ON claims (user_id);
+CREATE INDEX ON dc_contacts (claim_id);
+CREATE INDEX ON nominations (reservation_id, category_id);
+"""
+
+EPOCH = datetime(2021, 1, 1)
+
+
+def timestamp(minutes):
+    return (EPOCH + timedelta(minutes=minutes)).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+
+def member_columns(member):
+    # (ip, signed in at, membership number, first name, last name) for the [member]th member
+    return (
+        f'10.{member >> 16 & 255}.{member >> 8 & 255}.{member & 255}', timestamp(member),
+        str(1000 + member), f'First{member}', f'Last{member}',
+    )
+
+
+def popularity(entries):
+    # Zipf weights, so that a few entries are nominated by most members as in a real ballot
+    return [1 / rank for rank in range(1, entries + 1)]
+
+
+def nominations_rows(members, categories, entries, seed=0):
+    # Up to five nominations per member in each of the first [categories] categories, chosen
+    # from [entries] entries per category, with the occasional variant spelling
+    generator = random.Random(f'nominations-{seed}')
+    weights = popularity(entries)
+    for member in range(members):
+        ip, signed_in, membership, first_name, last_name = member_columns(member)
+        for category in list(CATEGORIES)[:categories]:
+            chosen = dict.fromkeys(generator.choices(range(entries), weights, k=generator.randint(1, 5)))
+            for entry in chosen:
+                title = f'{category.code} Entry {entry}'
+                if generator.random() < 0.1:
+                    title = title.upper()
+                yield (
+                    ip, ip, signed_in, '', '', '', '', timestamp(member + entry), membership,
+                    f'member{member}@example.com', '', '', '', first_name, last_name, category.name,
+                    title, f'Author {entry % 97}', f'Publisher {entry % 13}',
+                )
+
+
+def votes_rows(members, categories, finalists=6, seed=0):
+    # A ranked ballot of some or all of the finalists and No Award from every member in each
+    # of the first [categories] categories
+    generator = random.Random(f'votes-{seed}')
+    for member in range(members):
+        ip, signed_in, membership, first_name, last_name = member_columns(member)
+        for category in list(CATEGORIES)[:categories]:
+            ballot = [f'{category.code} Finalist {n}' for n in range(1, finalists + 1)] + ['No Award']
+            generator.shuffle(ballot)
+            for position, finalist in enumerate(ballot[:generator.randint(1, len(ballot))], 1):
+                yield (
+                    ip, ip, signed_in, '', '', '', '', timestamp(member), membership,
+                    f'member{member}@example.com', '', '', '', first_name, last_name, category.name,
+                    finalist, str(position),
+                )
+
+
+def write_csv(filename, header, rows):
+    # Data rows are written as they come: the nominations export has one column fewer than its header
+    written = 0
+    with open(filename, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def synthetic_results(category, finalists=6, ballots=2000, seed=0, places=None):
+    # Instant-runoff shaped counts: one per place, a round per elimination, until each
+    # remaining finalist has won a place (or for the first [places] places).
+    generator = random.Random(f'{category}-{seed}')
+    remaining = [f'{category} Finalist {n}' for n in range(1, finalists + 1)] + ['No award']
+    counts = []
+    place = 1
+    while len(remaining) > 1 and (places is None or place <= places):
+        tally = {finalist: generator.randint(1, ballots) for finalist in remaining}
+        rounds = []
+        while True:
+            rounds.append({'tally': [{'finalist': finalist, 'votes': votes} for finalist, votes in tally.items()]})
+            leader = max(tally, key=tally.get)
+            if len(tally) <= 2 or tally[leader] * 2 > sum(tally.values()):
+                break
+            eliminated = min(tally, key=tally.get)
+            transferred = tally.pop(eliminated)
+            for finalist in tally:
+                tally[finalist] += generator.randint(0, transferred // len(tally))
+        wins = generator.randint(ballots // 2, ballots)
+        counts.append({
+            'place': place,
+            'rounds': rounds,
+            'winner': leader,
+            'runoff': {'wins': wins, 'losses': ballots - wins},
+        })
+        remaining.remove(leader)
+        place += 1
+    return counts
+
+
+def seed_discon(dbconn, rows):
+    # Recreates the Discon3 tables in the discon3 schema from nominations_rows() output, one user,
+    # claim and contact per member. DISCON_SCHEMA leaves the session's search path on that schema.
+    from psycopg2.extras import execute_values
+    categories = {}
+    members = {}
+    nominations = []
+    for row in rows:
+        ip, signed_in, membership = row[0], row[2], int(row[8])
+        if row[15] not in categories:
+            categories[row[15]] = len(categories) + 1
+        if membership not in members:
+            members[membership] = (len(members) + 1, ip, signed_in.replace(' UTC', ''), row[9], row[13], row[14])
+        nominations.append(
+            (categories[row[15]], members[membership][0], row[7].replace(' UTC', ''), row[16], row[17], row[18])
+        )
+    with dbconn.cursor() as cursor:
+        cursor.execute(DISCON_SCHEMA)
+        execute_values(cursor, 'INSERT INTO categories (id, name) VALUES %s',
+                       [(category_id, name) for name, category_id in categories.items()])
+        execute_values(cursor, 'INSERT INTO reservations (id, membership_number) VALUES %s',
+                       [(member[0], membership) for membership, member in members.items()])
+        execute_values(cursor, 'INSERT INTO users (id, current_sign_in_ip, current_sign_in_at, email) VALUES %s',
+                       [(member[0], member[1], member[2], member[3]) for member in members.values()])
+        execute_values(cursor, 'INSERT INTO claims (id, reservation_id, user_id) VALUES %s',
+                       [(member[0], member[0], member[0]) for member in members.values()])
+        execute_values(cursor, 'INSERT INTO dc_contacts (claim_id, first_name, last_name) VALUES %s',
+                       [(member[0], member[4], member[5]) for member in members.values()])
+        execute_values(cursor, """
+        INSERT INTO nominations (category_id, reservation_id, created_at, field_1, field_2, field_3) VALUES %s
+        """, nominations, page_size=1000)
+        cursor.execute('ANALYZE categories, reservations, users, claims, dc_contacts, nominations')
+    dbconn.commit()
+    return len(nominations)
@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+
+from hugo_import.cli import add_profile, build_parser, configure
+from hugo_import.count_file import CountFileTranslator
+from hugo_import.profiling import profiled
+
+
+if __name__ == '__main__':
+    parser = build_parser('Count Hugo nominations (E Pluribus Hugo) or final ballots (instant runoff) '
+                          'from the CSV exports, without kansa.')
+    parser.add_argument('ballots', choices=('nominations', 'votes'), help='which export to count')
+    add_profile(parser)
+    args = parser.parse_args()
+    translator = configure(CountFileTranslator(), args)
+    with profiled(args.profile, translator, args.profiler):
+        if args.ballots == 'nominations':
+            translator.count_nominations()
+        else:
+            translator.count_votes()
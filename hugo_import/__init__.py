@@ -0,0 +1,11 @@
+from .categories import CATEGORIES, Category, CategoryRegistry, load_categories
+from .grouping import NominationGroup
+from .normalise import normalise_nomination, normalise_vote
+from .translator import HugoTranslator
+
+__all__ = (
+    'CATEGORIES', 'Category', 'CategoryRegistry', 'load_categories',
+    'NominationGroup',
+    'normalise_nomination', 'normalise_vote',
+    'HugoTranslator',
+)
@@ -0,0 +1,167 @@
+# Runs many conventions' imports in one invocation. Each section of a batch file is a job naming
+# an importer and that convention's own config file, with its databases, input files and
+# category schema; the jobs share one pool of worker threads, and each job's summary is written
+# to [batch] summary_dir as <job>.json. The files an import keeps between runs are per job: one
+# its config doesn't name is called <job>-<default name>, and no two jobs may use the same file.
+import configparser
+import io
+import json
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from .categories import load_categories
+from .discon import DisconTranslator
+from .nominations_file import NominationsFileTranslator
+from .votes_file import VotesFileTranslator
+
+IMPORTERS = {
+    'discon': DisconTranslator,
+    'nominations_file': NominationsFileTranslator,
+    'votes_file': VotesFileTranslator,
+}
+
+# (importers that use it, section, option, the option that switches it on, the name used when the
+# config gives none) for each file an import reads or writes besides its inputs
+JOB_FILES = (
+    (('discon',), 'sync', 'state_file', 'incremental', 'sync_state.json'),
+    (('discon', 'nominations_file'), 'snapshot', 'filename', 'enabled', 'discon3.sqlite'),
+    (('discon', 'nominations_file'), 'canonical', 'mapping_file', 'enabled', 'canonical.csv'),
+)
+
+
+def job_files(name, importer, config):
+    # Names the job's own files in config where it doesn't, and returns the absolute paths of the
+    # ones the job will use
+    used = []
+    for importers, section, option, switch, default in JOB_FILES:
+        if not config.has_section(section):
+            config.add_section(section)
+        if not config.get(section, option, fallback=''):
+            config[section][option] = f'{name}-{default}'
+        if importer in importers and config.getboolean(section, switch, fallback=False):
+            used.append(os.path.abspath(config[section][option]))
+    return used
+
+
+class JobOutput(io.TextIOBase):
+    # Stands in for sys.stdout while the jobs run, so that each line printed by a job is
+    # prefixed with the job's name however the jobs' output interleaves
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def start(self, name):
+        self.local.name = name
+        self.local.pending = ''
+
+    def write(self, text):
+        name = getattr(self.local, 'name', None)
+        if name is None:
+            with self.lock:
+                return self.stream.write(text)
+        *lines, self.local.pending = (self.local.pending + text).split('\n')
+        with self.lock:
+            for line in lines:
+                self.stream.write(f'[{name}] {line}\n')
+        return len(text)
+
+    def finish(self):
+        if self.local.pending:
+            self.write('\n')
+        self.local.name = None
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run_job(name, section, output, dry_run=False, debug=None):
+    importer = section.get('importer', 'discon')
+    translator = IMPORTERS[importer]()
+    output.start(name)
+    status = 'ok'
+    try:
+        translator.read_config(section.get('config', 'config.ini'))
+        job_files(name, importer, translator.config)
+        if section.get('categories'):
+            translator.categories = load_categories(section['categories'])
+        translator.debug = debug
+        translator.dry_run = dry_run
+        translator.connect_db()
+        if importer == 'discon':
+            translator.connect_discon_db()
+            translator.copy_nominations()
+        else:
+            translator.import_file()
+    except SystemExit:
+        # The importers print their own error before exiting
+        status = 'failed'
+    except Exception:
+        traceback.print_exc(file=sys.stdout)
+        status = 'failed'
+    finally:
+        translator.close()
+        output.finish()
+    summary = translator.stats.summary()
+    summary.update({'job': name, 'importer': importer, 'status': status})
+    return summary
+
+
+def run_batch(filename, workers=None, dry_run=False, debug=None):
+    # Returns every job's summary, in the order the jobs appear in the batch file
+    batch = configparser.ConfigParser()
+    if not batch.read(filename):
+        print(f'Unable to read batch file {filename}')
+        sys.exit(1)
+    jobs = [name for name in batch.sections() if name != 'batch']
+    for name in jobs:
+        importer = batch[name].get('importer', 'discon')
+        if importer not in IMPORTERS:
+            print(f"{name}: unknown importer {importer}, expected one of {', '.join(IMPORTERS)}")
+            sys.exit(1)
+        for option in ('config', 'categories'):
+            if batch[name].get(option) and not os.path.exists(batch[name][option]):
+                print(f'{name}: {option} file {batch[name][option]} not found')
+                sys.exit(1)
+    # Jobs run at once, so one job's checkpoint, snapshot or mapping file mustn't be another's
+    users = {}
+    for name in jobs:
+        config = configparser.ConfigParser()
+        config.read(batch[name].get('config', 'config.ini'))
+        for path in job_files(name, batch[name].get('importer', 'discon'), config):
+            if path in users:
+                print(f'{name}: {path} is also used by {users[path]}: name a file of its own in its config')
+                sys.exit(1)
+            users[path] = name
+    workers = workers or batch.getint('batch', 'workers', fallback=1)
+    summary_dir = batch.get('batch', 'summary_dir', fallback='batch')
+    os.makedirs(summary_dir, exist_ok=True)
+    output = JobOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_job, name, batch[name], output, dry_run, debug) for name in jobs]
+            summaries = [future.result() for future in futures]
+    finally:
+        sys.stdout = output.stream
+    for summary in summaries:
+        with open(os.path.join(summary_dir, f"{summary['job']}.json"), 'w') as fh:
+            json.dump(summary, fh, indent=2)
+            fh.write('\n')
+    return summaries
+
+
+def print_summaries(summaries):
+    print(f"{'job':<20} {'importer':<17} {'status':<7} {'seconds':>9} {'rows':>9} {'inserted':>9}")
+    for summary in summaries:
+        counters = summary['counters']
+        print(f"{summary['job']:<20} {summary['importer']:<17} {summary['status']:<7} {summary['seconds']:>9.3f} "
+              f"{counters.get('rows', 0):>9} {counters.get('inserted', 0):>9}")
@@ -0,0 +1,128 @@
+# Clusters the free-text nominations of each category into likely-equivalent entries. Values are
+# reduced to a normalised key, and keys are compared through an inverted index of their
+# trigrams, so each key is only scored against keys it shares a rare trigram with rather than
+# against every other key. Candidate pairs that clear the Jaccard threshold are merged with
+# union-find.
+import re
+import unicodedata
+from collections import Counter
+from fractions import Fraction
+
+# Only these fields carry the identity of a nomination; the rest are free-form supporting text
+CANONICAL_FIELDS = ('title', 'author', 'editor')
+ARTICLES = ('the ', 'a ', 'an ')
+PUNCTUATION = re.compile(r'[\W_]+')
+
+
+def normalise_key(value):
+    value = unicodedata.normalize('NFKD', value.casefold().replace('&', ' and '))
+    value = ''.join(character for character in value if not unicodedata.combining(character))
+    value = ' '.join(PUNCTUATION.sub(' ', value).split())
+    for article in ARTICLES:
+        if value.startswith(article):
+            return value[len(article):]
+    return value
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def cluster_keys(keys, threshold=0.6):
+    # Returns the cluster root index for each of the distinct keys
+    grams = [trigrams(key) for key in keys]
+    frequency = Counter(gram for key_grams in grams for gram in key_grams)
+    # Prefix filtering: with every key's grams sorted rarest first, two keys with a Jaccard
+    # similarity of at least t must share a gram among the first |A| - ceil(t|A|) + 1 of each.
+    # Only those prefixes are indexed, so the posting lists hold rare grams and stay short.
+    postings = {}
+    clusters = UnionFind(len(keys))
+    # The threshold as the decimal it was written as, p/q, so that the comparisons below are exact in
+    # integers: a similarity of o / (|A| + |B| - o) >= p/q when o(p + q) >= p(|A| + |B|)
+    threshold = Fraction(str(threshold))
+    p, q = threshold.numerator, threshold.denominator
+    # Keys are visited smallest first, so a posting entry too small to reach the threshold
+    # against the current key is too small for every later one and can be dropped for good
+    for index in sorted(range(len(keys)), key=lambda index: len(grams[index])):
+        key_grams = grams[index]
+        size = len(key_grams)
+        # Keys with fewer than p/q of this key's grams can't be similar enough to it
+        smallest = -(-p * size // q)
+        ordered = sorted(key_grams, key=lambda gram: (frequency[gram], gram))
+        overlaps = {}
+        for position, gram in enumerate(ordered[:size - smallest + 1]):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = [(index, position)]
+                continue
+            stale = 0
+            while stale < len(posting) and len(grams[posting[stale][0]]) < smallest:
+                stale += 1
+            if stale:
+                del posting[:stale]
+            # Positional filter: the overlap so far plus what is left after these positions is
+            # an upper bound on the final overlap, so hopeless candidates are dropped early
+            remaining = size - position - 1
+            for other, other_position in posting:
+                overlap = overlaps.get(other, 0)
+                if overlap < 0:
+                    continue
+                other_size = len(grams[other])
+                bound = overlap + 1 + min(remaining, other_size - other_position - 1)
+                if bound * (p + q) < p * (size + other_size):
+                    overlaps[other] = -1
+                else:
+                    overlaps[other] = overlap + 1
+            posting.append((index, position))
+        for other, overlap in overlaps.items():
+            if overlap > 0 and len(key_grams & grams[other]) * (p + q) >= p * (size + len(grams[other])):
+                clusters.union(index, other)
+    return [clusters.find(index) for index in range(len(keys))]
+
+
+def canonical_mapping(nominations_list, threshold=0.6):
+    # Yields (category, field, canonical_id, canonical, value, nominations) for every distinct
+    # value of the canonical fields. IDs are numbered per category and field, most nominated first,
+    # and the canonical spelling is the cluster's most nominated one.
+    spellings = {}
+    for group in nominations_list.values():
+        category = group.category
+        fields = category.fields
+        for position, value in enumerate(group.values):
+            field = fields[position % 3]
+            if value and field in CANONICAL_FIELDS:
+                spellings.setdefault((category.code, field), Counter())[value] += 1
+    for (category, field), values in spellings.items():
+        keys = {}
+        for value in values:
+            keys.setdefault(normalise_key(value), []).append(value)
+        distinct_keys = list(keys)
+        roots = cluster_keys(distinct_keys, threshold)
+        members = {}
+        for key, root in zip(distinct_keys, roots):
+            members.setdefault(root, []).extend(keys[key])
+        clusters = sorted(
+            members.values(), key=lambda cluster: -sum(values[value] for value in cluster)
+        )
+        for canonical_id, cluster in enumerate(clusters, 1):
+            cluster.sort(key=lambda value: -values[value])
+            for value in cluster:
+                yield category, field, canonical_id, cluster[0], value, values[value]
@@ -0,0 +1,86 @@
+import json
+import sys
+
+# (award name as it appears in Discon3 exports, kansa category code, nomination fields). The Docker
+# image ships without schemas/, so these stay in code; tests/test_categories.py checks that
+# schemas/discon3.json says the same.
+CATEGORY_DEFINITIONS = (
+    ('Best Novel', 'Novel', ('title', 'author', 'publisher')),
+    ('Best Novella', 'Novella', ('title', 'author', 'publisher')),
+    ('Best Novelette', 'Novelette', ('title', 'author', 'publisher')),
+    ('Best Short Story', 'ShortStory', ('title', 'author', 'publisher')),
+    ('Best Related Work', 'RelatedWork', ('title', 'author', 'publisher')),
+    ('Best Graphic Story or Comic', 'GraphicStory', ('title', 'author', 'publisher')),
+    ('Best Dramatic Presentation, Long Form', 'DramaticLong', ('title', 'producer', 'p1')),
+    ('Best Dramatic Presentation, Short Form', 'DramaticShort', ('title', 'series', 'producer')),
+    ('Best Editor, Long Form', 'EditorLong', ('editor', 'p1', 'p2')),
+    ('Best Editor, Short Form', 'EditorShort', ('editor', 'p1', 'p2')),
+    ('Best Professional Artist', 'ProArtist', ('author', 'example', 'p1')),
+    ('Best Semiprozine', 'Semiprozine', ('title', 'p1', 'p2')),
+    ('Best Fanzine', 'Fanzine', ('title', 'p1', 'p2')),
+    ('Best Fancast', 'Fancast', ('title', 'address', 'p1')),
+    ('Best Fan Writer', 'FanWriter', ('author', 'example', 'p1')),
+    ('Best Fan Artist', 'FanArtist', ('author', 'example', 'p1')),
+    ('Best Series', 'Series', ('title', 'author', 'volume')),
+    ('Astounding Award for Best New Writer, sponsored by Dell Magazines (not a Hugo)', 'Astounding',
+     ('author', 'example', 'p1')),
+    ('Best Video Game', 'BestVideoGame', ('title', 'author', 'publisher')),
+    ('Lodestar Award for Best Young Adult Book (not a Hugo)', 'Lodestar', ('title', 'author', 'publisher')),
+)
+
+# Alternative spellings seen in exports, mapped to the award name above
+CATEGORY_ALIASES = {
+    'Astounding Award for the Best New Writer, sponsored by Dell Magazines (not a Hugo)':
+        'Astounding Award for Best New Writer, sponsored by Dell Magazines (not a Hugo)',
+}
+
+
+class Category:
+    __slots__ = ('name', 'code', 'fields')
+
+    def __init__(self, name, code, fields):
+        self.name = name
+        self.code = sys.intern(code)
+        self.fields = tuple(sys.intern(field) for field in fields)
+
+    def __repr__(self):
+        return f'Category({self.name!r}, {self.code!r}, {self.fields!r})'
+
+
+class CategoryRegistry:
+    def __init__(self, definitions, aliases=None):
+        self.by_name = {}
+        self.by_code = {}
+        for name, code, fields in definitions:
+            category = Category(name, code, fields)
+            self.by_name[name] = category
+            self.by_code[category.code] = category
+        for alias, name in (aliases or {}).items():
+            self.by_name[alias] = self.by_name[name]
+
+    def __getitem__(self, name):
+        return self.by_name[name]
+
+    def __iter__(self):
+        return iter(self.by_code.values())
+
+    def __len__(self):
+        return len(self.by_code)
+
+    @classmethod
+    def from_schema(cls, schema):
+        # schema is a convention's parsed JSON schema file: see schemas/discon3.json
+        definitions = []
+        for category in schema['categories']:
+            if len(category['fields']) != 3:
+                raise ValueError(f"{category['name']}: a category has exactly three nomination fields")
+            definitions.append((category['name'], category['code'], category['fields']))
+        return cls(definitions, schema.get('aliases'))
+
+
+CATEGORIES = CategoryRegistry(CATEGORY_DEFINITIONS, CATEGORY_ALIASES)
+
+
+def load_categories(filename):
+    with open(filename, 'r') as fh:
+        return CategoryRegistry.from_schema(json.load(fh))
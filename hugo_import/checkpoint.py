@@ -0,0 +1,23 @@
+import json
+import os
+from datetime import datetime, timezone
+
+
+def read_checkpoint(filename):
+    try:
+        with open(filename, 'r') as fh:
+            return json.load(fh)['last_nomination_id']
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(filename, last_nomination_id):
+    state = {
+        'last_nomination_id': last_nomination_id,
+        'updated_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC'),
+    }
+    # Write then rename, so an interrupted run never leaves a truncated state file behind
+    temp_filename = f'{filename}.tmp'
+    with open(temp_filename, 'w') as fh:
+        json.dump(state, fh, indent=2)
+    os.replace(temp_filename, filename)
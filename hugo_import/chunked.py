@@ -0,0 +1,105 @@
+# Parallel ingestion of very large nominations exports. The file is memory-mapped and cut into
+# chunks at record boundaries; worker processes parse and group their chunks independently and
+# the partial groups are merged back in file order, so every key ends up with its nominations
+# in the same order as a single-process read.
+import csv
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+from .grouping import NominationGroup
+from .normalise import NOMINATION_EXPORT_COLUMNS, normalise_nomination
+
+NOMINATION_COLUMNS = itemgetter(*NOMINATION_EXPORT_COLUMNS)
+# Each chunk is decoded whole in its worker, so this bounds the workers' memory
+CHUNK_BYTES = 64 * 2 ** 20
+QUOTE_BLOCK_BYTES = 2 ** 20
+
+
+def count_quotes(mapped, start, end):
+    # Counted a block at a time, so that no more than a block of the mapping is copied at once
+    return sum(
+        mapped[block:min(block + QUOTE_BLOCK_BYTES, end)].count(b'"')
+        for block in range(start, end, QUOTE_BLOCK_BYTES)
+    )
+
+
+def record_end(mapped, start, position):
+    # The first line break at or after position that isn't inside a quoted field. A newline
+    # ends a record when an even number of quotes lie between it and start, a known record
+    # boundary: doubled quotes inside a field always come in pairs.
+    quotes = count_quotes(mapped, start, position)
+    while True:
+        newline = mapped.find(b'\n', position)
+        if newline < 0:
+            return len(mapped)
+        quotes += count_quotes(mapped, position, newline)
+        if quotes % 2 == 0:
+            return newline + 1
+        position = newline + 1
+
+
+def chunk_boundaries(mapped, chunks):
+    # (start, end) byte ranges of whole records, after the header row
+    size = len(mapped)
+    start = record_end(mapped, 0, 0)
+    boundaries = []
+    for chunk in range(1, chunks + 1):
+        end = size if chunk == chunks else record_end(mapped, start, max(start, size * chunk // chunks))
+        if end > start:
+            boundaries.append((start, end))
+            start = end
+    return boundaries
+
+
+def group_chunk(categories, filename, start, end):
+    # Runs in a worker process. Groups are returned as (key, values) pairs in first-seen order
+    # rather than NominationGroups, so that only plain tuples and strings are pickled back.
+    with open(filename, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        text = mapped[start:end].decode('utf-8')
+    groups = {}
+    rows = 0
+    # Universal newlines, as the csv module reader gets from open() in text mode
+    for row in csv.reader(io.StringIO(text, newline=None)):
+        nominations_key, category, values = normalise_nomination(categories, *NOMINATION_COLUMNS(row))
+        group = groups.get(nominations_key)
+        if group is None:
+            group = groups[nominations_key] = []
+        group.extend(values)
+        rows += 1
+    return list(groups.items()), rows
+
+
+def group_nominations(categories, filename, processes=None):
+    # Returns (nominations_list, rows), the same grouping as HugoTranslator.group_nominations
+    processes = processes or os.cpu_count() or 1
+    with open(filename, 'rb') as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size == 0:
+            return {}, 0
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # A few chunks per process, so that one slow chunk doesn't leave the others idle
+            boundaries = chunk_boundaries(mapped, max(processes * 4, size // CHUNK_BYTES + 1))
+    if not boundaries:
+        return {}, 0
+    nominations_list = {}
+    rows = 0
+    by_code = categories.by_code
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # map() hands the results back in chunk order, whichever process finishes first
+        partials = executor.map(
+            group_chunk, *zip(*((categories, filename, start, end) for start, end in boundaries))
+        )
+        for groups, chunk_rows in partials:
+            rows += chunk_rows
+            for nominations_key, values in groups:
+                group = nominations_list.get(nominations_key)
+                if group is None:
+                    # Most keys sit in a single chunk: take over its list rather than copy it
+                    group = nominations_list[nominations_key] = NominationGroup(by_code[nominations_key[5]])
+                    group.values = values
+                else:
+                    group.values.extend(values)
+    return nominations_list, rows
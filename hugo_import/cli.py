@@ -0,0 +1,32 @@
+import argparse
+
+from .profiling import PROFILERS
+
+
+def build_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--config', default='config.ini', help='configuration file (default: config.ini)')
+    parser.add_argument('--debug', action='store_true', default=None,
+                        help='print every grouped ballot as it is processed')
+    return parser
+
+
+def add_dry_run(parser):
+    parser.add_argument('--dry-run', '--diff', action='store_true', dest='dry_run',
+                        help='report which ballots are new, unchanged or conflicting in kansa, without writing')
+
+
+def add_profile(parser):
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='PREFIX',
+                        help='profile the run, writing PREFIX.pstats and PREFIX.collapsed stacks for a flamegraph, '
+                             'and report database wait apart from CPU time (default PREFIX: profile)')
+    parser.add_argument('--profiler', choices=PROFILERS, default='both',
+                        help='cprofile records every call; sample only samples stacks, at much less cost '
+                             '(default: both)')
+
+
+def configure(translator, args):
+    translator.read_config(args.config)
+    translator.debug = args.debug
+    translator.dry_run = getattr(args, 'dry_run', False)
+    return translator
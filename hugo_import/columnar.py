@@ -0,0 +1,76 @@
+# Optional pandas ingestion for the CSV importers. Only the columns the import uses are parsed,
+# the category column is dictionary-encoded, and nominations are grouped with a vectorised
+# group-by; Python only loops once per grouped key rather than once per row.
+import sys
+
+from .grouping import NominationGroup
+from .normalise import DEFAULT_IP, DEFAULT_TIMESTAMP, NOMINATION_EXPORT_COLUMNS, VOTE_EXPORT_COLUMNS
+
+NOMINATION_USECOLS = NOMINATION_EXPORT_COLUMNS
+VOTE_USECOLS = VOTE_EXPORT_COLUMNS
+
+
+def available():
+    # pandas is only imported when the columnar engine is used, as it is slow to import
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def read_columns(filename, usecols):
+    import pandas as pd
+    frame = pd.read_csv(
+        filename, header=None, skiprows=1, usecols=usecols, dtype=object,
+        keep_default_na=False, na_filter=False, engine='c',
+    )
+    frame[usecols[0]] = frame[usecols[0]].astype('category')
+    return frame
+
+
+def category_codes(categories, frame, column):
+    # One registry lookup per distinct category name rather than one per row
+    names = frame[column].cat.categories
+    return frame[column].cat.rename_categories([categories[name].code for name in names])
+
+
+def group_nominations(categories, filename):
+    category, current_ts, current_ip, membership_id, first_name, last_name, field_1, field_2, field_3 = \
+        NOMINATION_USECOLS
+    frame = read_columns(filename, NOMINATION_USECOLS)
+    frame[current_ts] = frame[current_ts].mask(frame[current_ts] == '', DEFAULT_TIMESTAMP)
+    frame[current_ip] = frame[current_ip].mask(frame[current_ip] == '', DEFAULT_IP)
+    frame['code'] = category_codes(categories, frame, category)
+    key_columns = [current_ts, current_ip, membership_id, first_name, last_name, 'code']
+
+    # Number the keys in order of first appearance, then stable-sort the rows by key number
+    # so that each key's rows are contiguous and still in file order
+    group_ids = frame.groupby(key_columns, sort=False, observed=True).ngroup().to_numpy()
+    order = group_ids.argsort(kind='stable')
+    boundaries = (group_ids[order][1:] != group_ids[order][:-1]).nonzero()[0] + 1
+    starts = [0] + boundaries.tolist()
+    ends = boundaries.tolist() + [len(order)]
+    values = frame[[field_1, field_2, field_3]].to_numpy(dtype=object)[order].ravel().tolist()
+    values = list(map(sys.intern, values))
+    first_rows = order[starts] if len(order) else order
+    key_values = [frame[column].to_numpy(dtype=object)[first_rows].tolist() for column in key_columns[:5]]
+    category_names = frame[category].to_numpy(dtype=object)[first_rows].tolist()
+
+    nominations_list = {}
+    for key, name, start, end in zip(zip(*key_values), category_names, starts, ends):
+        group = NominationGroup(categories[name])
+        group.values = values[start * 3:end * 3]
+        nominations_list[key + (group.category.code,)] = group
+    return nominations_list
+
+
+def read_ranks(categories, filename):
+    category, membership_id, first_name, last_name, finalist, position = VOTE_USECOLS
+    frame = read_columns(filename, VOTE_USECOLS)
+    codes = category_codes(categories, frame, category).astype(object).tolist()
+    finalists = frame[finalist].tolist()
+    categorised_finalists = list(zip(codes, finalists))
+    votes_keys = list(zip(frame[membership_id].tolist(), frame[first_name].tolist(), frame[last_name].tolist(), codes))
+    positions = frame[position].astype(int).tolist()
+    return list(zip(votes_keys, positions, categorised_finalists))
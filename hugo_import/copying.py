@@ -0,0 +1,36 @@
+import io
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_text(value):
+    # A value in COPY's text format; lists are integer arrays
+    if value is None:
+        return '\\N'
+    if isinstance(value, (list, tuple)):
+        return '{' + ','.join(str(x) for x in value) + '}'
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class CopyRows(io.TextIOBase):
+    # A file-like object that formats rows for COPY ... FROM STDIN as it is read,
+    # so rows can be streamed to the server without first building the whole payload.
+
+    def __init__(self, rows):
+        super().__init__()
+        self.lines = ('\t'.join(map(copy_text, row)) + '\n' for row in rows)
+        self.buffer = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
@@ -0,0 +1,183 @@
+# Offline counting of imported ballots: instant runoff with the No Award runoff for the final
+# ballot, and E Pluribus Hugo for nominations. Ballots are tuples of integer finalist IDs and
+# identical ballots are counted once with a weight. Each elimination only moves the ballots
+# that were sitting with the eliminated finalists, rather than recounting every ballot.
+from collections import Counter
+from functools import reduce
+from math import gcd
+
+from .normalise import NO_AWARD_ID
+from .results import NO_AWARD_RESULT
+
+
+def _tally(piles, weights, continuing):
+    return {finalist: sum(weights[ballot] for ballot in piles[finalist]) for finalist in continuing}
+
+
+def _transfer(ballot, ballots, positions, piles, continuing):
+    # Move a ballot on to its next continuing preference, if it has one
+    preferences = ballots[ballot]
+    position = positions[ballot] + 1
+    while position < len(preferences) and preferences[position] not in continuing:
+        position += 1
+    positions[ballot] = position
+    if position < len(preferences):
+        piles[preferences[position]].append(ballot)
+
+
+def instant_runoff(ballots, weights, candidates):
+    # Returns (winner, rounds) for one place; rounds are (tally, eliminated) pairs
+    continuing = set(candidates)
+    positions = [-1] * len(ballots)
+    piles = {finalist: [] for finalist in continuing}
+    for ballot in range(len(ballots)):
+        _transfer(ballot, ballots, positions, piles, continuing)
+    tally = _tally(piles, weights, continuing)
+    first_round = dict(tally)
+    rounds = []
+    while True:
+        total = sum(tally.values())
+        leader = max(tally, key=lambda finalist: (tally[finalist], first_round[finalist]))
+        if tally[leader] * 2 > total or len(continuing) <= 2:
+            rounds.append((dict(tally), []))
+            return leader, rounds
+        # Ties for last place go to the finalist with fewer first-round votes; if still tied,
+        # they are eliminated together
+        fewest = min(tally.values())
+        tied = [finalist for finalist in continuing if tally[finalist] == fewest]
+        fewest_first = min(first_round[finalist] for finalist in tied)
+        eliminated = [finalist for finalist in tied if first_round[finalist] == fewest_first]
+        if len(eliminated) == len(continuing):
+            rounds.append((dict(tally), []))
+            return leader, rounds
+        rounds.append((dict(tally), eliminated))
+        continuing.difference_update(eliminated)
+        for finalist in eliminated:
+            del tally[finalist]
+            for ballot in piles.pop(finalist):
+                preferences = ballots[ballot]
+                _transfer(ballot, ballots, positions, piles, continuing)
+                if positions[ballot] < len(preferences):
+                    tally[preferences[positions[ballot]]] += weights[ballot]
+
+
+def no_award_runoff(ballots, weights, winner):
+    # Ballots preferring the winner to No Award, and ballots preferring No Award to the winner
+    wins = losses = 0
+    for preferences, weight in zip(ballots, weights):
+        for finalist in preferences:
+            if finalist == winner:
+                wins += weight
+                break
+            if finalist == NO_AWARD_ID:
+                losses += weight
+                break
+    return wins, losses
+
+
+def count_final_ballots(rankings, names):
+    # rankings: finalist ID sequences in preference order, NO_AWARD_ID for No Award.
+    # names: finalist ID to title. Returns kansa's place/rounds/tally/winner/runoff shape, with the
+    # finalist that was tested against No Award named in the runoff.
+    weighted = Counter(tuple(ranking) for ranking in rankings if ranking)
+    ballots = list(weighted)
+    weights = [weighted[ballot] for ballot in ballots]
+    names = dict(names)
+    names[NO_AWARD_ID] = NO_AWARD_RESULT
+    candidates = {finalist for ballot in ballots for finalist in ballot} | {NO_AWARD_ID}
+    counts = []
+    place = 1
+    while len(candidates) > 1:
+        winner, rounds = instant_runoff(ballots, weights, candidates)
+        tested = winner
+        if winner == NO_AWARD_ID:
+            wins = losses = 0
+        else:
+            wins, losses = no_award_runoff(ballots, weights, winner)
+            # The WSFS No Award test: the place goes to No Award when more ballots rank No Award
+            # above the runoff winner than the other way round, unless No Award has already taken a place
+            if losses > wins and NO_AWARD_ID in candidates:
+                winner = NO_AWARD_ID
+        counts.append({
+            'place': place,
+            'rounds': [
+                {
+                    'tally': [
+                        {'finalist': names[finalist], 'votes': votes}
+                        for finalist, votes in sorted(tally.items(), key=lambda item: -item[1])
+                    ],
+                    'eliminated': [names[finalist] for finalist in eliminated],
+                }
+                for tally, eliminated in rounds
+            ],
+            'winner': names[winner],
+            'runoff': {'finalist': names[tested], 'wins': wins, 'losses': losses},
+        })
+        candidates.discard(winner)
+        place += 1
+    return counts
+
+
+def count_nominations(nominations, names, finalists=6):
+    # E Pluribus Hugo. nominations: one set of integer nominee IDs per ballot; names: nominee ID to
+    # the name it is reported under. Each round every ballot shares one point equally among its
+    # remaining nominees; of the two nominees with the lowest points, the one on fewer ballots is
+    # eliminated, until [finalists] remain. Nominees level on points and ballots are listed in ID order.
+    weighted = Counter(frozenset(nominees) for nominees in nominations if nominees)
+    ballots = list(weighted)
+    weights = [weighted[ballot] for ballot in ballots]
+    # Points are kept as integer multiples of 1/scale so that ties are exact
+    largest = max((len(ballot) for ballot in ballots), default=1)
+    scale = reduce(lambda a, b: a * b // gcd(a, b), range(1, largest + 1), 1)
+    sizes = [len(ballot) for ballot in ballots]
+    points = Counter()
+    ballot_counts = Counter()
+    containing = {}
+    for ballot, (nominees, weight) in enumerate(zip(ballots, weights)):
+        for nominee in nominees:
+            points[nominee] += weight * scale // sizes[ballot]
+            ballot_counts[nominee] += weight
+            containing.setdefault(nominee, []).append(ballot)
+    remaining = set(containing)
+    rounds = []
+    while True:
+        tally = [
+            {'finalist': names[nominee], 'points': round(points[nominee] / scale, 3),
+             'nominations': ballot_counts[nominee]}
+            for nominee in sorted(remaining, key=lambda nominee: (-points[nominee], -ballot_counts[nominee], nominee))
+        ]
+        if len(remaining) <= finalists:
+            rounds.append({'tally': tally, 'eliminated': []})
+            break
+        # Selection: the two lowest point totals, taking in everyone tied with either
+        lowest = sorted({points[nominee] for nominee in remaining})[:2]
+        if len(lowest) == 1 or sum(1 for nominee in remaining if points[nominee] == lowest[0]) > 1:
+            lowest = lowest[:1]
+        selected = [nominee for nominee in remaining if points[nominee] in lowest]
+        # Elimination: fewest ballots, then fewest points, otherwise all tied go together
+        fewest = min(ballot_counts[nominee] for nominee in selected)
+        selected = [nominee for nominee in selected if ballot_counts[nominee] == fewest]
+        fewest = min(points[nominee] for nominee in selected)
+        eliminated = [nominee for nominee in selected if points[nominee] == fewest]
+        if len(remaining) - len(eliminated) < finalists:
+            rounds.append({'tally': tally, 'eliminated': []})
+            break
+        rounds.append({'tally': tally, 'eliminated': [names[nominee] for nominee in eliminated]})
+        remaining.difference_update(eliminated)
+        for nominee in eliminated:
+            for ballot in containing.pop(nominee):
+                weight = weights[ballot]
+                old_share = scale // sizes[ballot]
+                sizes[ballot] -= 1
+                if sizes[ballot]:
+                    new_share = scale // sizes[ballot]
+                    for other in ballots[ballot]:
+                        if other in remaining:
+                            points[other] += weight * (new_share - old_share)
+    return {
+        'rounds': rounds,
+        'finalists': [
+            names[nominee]
+            for nominee in sorted(remaining, key=lambda nominee: (-points[nominee], -ballot_counts[nominee], nominee))
+        ],
+    }
@@ -0,0 +1,86 @@
+import json
+import os
+from collections import Counter
+
+from .count import count_final_ballots, count_nominations
+from .nominations_file import NominationsFileTranslator
+from .results import write_results
+from .votes_file import VotesFileTranslator
+
+
+def nominee_key(value):
+    # Nominees are matched on their first field (title, author or editor), ignoring case and spacing
+    return ' '.join(value.split()).casefold()
+
+
+class CountFileTranslator(NominationsFileTranslator, VotesFileTranslator):
+    # Counts the CSV exports locally, with no kansa connection
+    stats_name = 'count_file'
+
+    def output_dir(self):
+        output_dir = self.config.get('count', 'output_dir', fallback='count')
+        os.makedirs(output_dir, exist_ok=True)
+        return output_dir
+
+    def write_json(self, filename, data):
+        with open(os.path.join(self.output_dir(), filename), 'w') as fh:
+            json.dump(data, fh, indent=2)
+
+    def count_votes(self):
+        stats = self.stats
+        with stats.stage('parse'):
+            ranks = self.load_ranks(self.config['file']['votes_filename'])
+        stats.count('rows', len(ranks))
+        with stats.stage('group'):
+            # Local finalist IDs in order of first appearance
+            finalist_ids = {}
+            for votes_key, position, categorised_finalist in ranks:
+                finalist_ids.setdefault(categorised_finalist, len(finalist_ids))
+            ballots = {}
+            for votes_key, rankings in self.rank_votes(self.group_votes(ranks, finalist_ids)).items():
+                ballots.setdefault(votes_key[3], []).append(rankings)
+            names = {finalist_id: title for (category, title), finalist_id in finalist_ids.items()}
+        stats.count('keys', sum(len(rankings) for rankings in ballots.values()))
+        with stats.stage('count'):
+            for category, rankings in ballots.items():
+                counts = count_final_ballots(rankings, names)
+                self.write_json(f'{category}.json', counts)
+                with open(os.path.join(self.output_dir(), f'{category}.csv'), 'w') as fh:
+                    write_results(counts, fh)
+                if not counts:
+                    print(f'{category}: no ballots')
+                elif counts[0]['winner'] != counts[0]['runoff']['finalist']:
+                    runoff = counts[0]['runoff']
+                    print(f"{category}: {counts[0]['winner']} ({runoff['finalist']} lost the No Award runoff "
+                          f"{runoff['wins']} to {runoff['losses']})")
+                else:
+                    print(f'{category}: {counts[0]["winner"]}')
+        self.report()
+
+    def count_nominations(self):
+        stats = self.stats
+        finalists = self.config.getint('count', 'finalists', fallback=6)
+        nominations_list = self.load_nominations(self.config['file']['nominations_filename'])
+        with stats.stage('count'):
+            ballots = {}
+            # Nominee keys are numbered in order of first appearance, so ballots are sets of ints
+            nominee_ids = {}
+            spellings = Counter()
+            for group in nominations_list.values():
+                nominees = set()
+                for value in group.values[::3]:
+                    key = nominee_key(value)
+                    if key:
+                        nominee_id = nominee_ids.setdefault(key, len(nominee_ids))
+                        nominees.add(nominee_id)
+                        spellings[(nominee_id, value)] += 1
+                ballots.setdefault(group.category.code, []).append(nominees)
+            # Each nominee is reported under its most common spelling
+            names = {}
+            for (nominee_id, value), count in spellings.most_common():
+                names.setdefault(nominee_id, value)
+            for category, nominations in ballots.items():
+                result = count_nominations(nominations, names, finalists)
+                self.write_json(f'{category}-nominations.json', result)
+                print(f'{category}: {", ".join(result["finalists"])}')
+        self.report()
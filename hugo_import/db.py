@@ -0,0 +1,129 @@
+# Everything that needs psycopg2 is imported through here, so that the file-only tools
+# don't pay for importing it until a database connection is actually opened.
+import sys
+import time
+
+import psycopg2 as dbm
+from psycopg2.extras import Json, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+
+__all__ = ('dbm', 'Json', 'execute_values', 'connect', 'pool', 'getconn', 'TRANSIENT_ERRORS', 'query_failed',
+           'prepare', 'timing_cursor')
+
+# A dropped or reset connection, a serialisation failure or deadlock, a cancelled statement:
+# the transaction is lost but running it again can succeed
+TRANSIENT_ERRORS = (dbm.OperationalError, dbm.InterfaceError)
+
+
+def connection_args(params):
+    return {
+        'database': params['database'],
+        'user': params['user'],
+        'password': params['password'],
+        'host': params['host'],
+        'port': params['port'],
+    }
+
+
+def retry_connect(params, open_connection):
+    # Opens a connection, retrying with exponential backoff before giving up on the import
+    retries = params.getint('retries', fallback=3)
+    delay = params.getfloat('retry_delay', fallback=1.0)
+    for attempt in range(retries + 1):
+        try:
+            return open_connection()
+        except dbm.OperationalError as err:
+            if attempt == retries:
+                print(f"Unable to connect to database {err}")
+                sys.exit(1)
+            print(f"Unable to connect to database, retrying in {delay * 2 ** attempt:g}s: {err}")
+            time.sleep(delay * 2 ** attempt)
+
+
+def connect(params):
+    return retry_connect(params, lambda: dbm.connect(**connection_args(params)))
+
+
+def pool(params, size):
+    # Connections are opened on first use and kept open for reuse by later transactions
+    return ThreadedConnectionPool(0, size, **connection_args(params))
+
+
+def getconn(connection_pool, params):
+    return retry_connect(params, connection_pool.getconn)
+
+
+def query_failed(err):
+    # Transient errors go back up to HugoTranslator.transaction to be retried; anything else
+    # ends the import
+    if isinstance(err, TRANSIENT_ERRORS):
+        raise err
+    print(f"Unable to run query {err}")
+    sys.exit(1)
+
+
+def prepare(cursor, name, statement):
+    # Prepared statements belong to the session, so a pooled connection may already have it
+    cursor.execute('SELECT 1 FROM pg_prepared_statements WHERE name=%s', (name,))
+    if cursor.fetchone() is None:
+        cursor.execute(f'PREPARE {name} AS {statement}')
+
+
+def timing_cursor(stats):
+    # A cursor class for profiling, charging the wall time of each statement, COPY and fetch to
+    # stats.add_wait, so that waiting on the server is reported apart from Python's own CPU time.
+    # Only the methods the importers use are timed.
+    perf_counter = time.perf_counter
+    base = dbm.extensions.cursor
+
+    class TimingCursor(base):
+
+        def execute(self, query, vars=None):
+            stats.count('queries')
+            started = perf_counter()
+            try:
+                return base.execute(self, query, vars)
+            finally:
+                stats.add_wait(perf_counter() - started)
+
+        def copy_expert(self, sql, file, size=8192):
+            stats.count('queries')
+            started = perf_counter()
+            try:
+                return base.copy_expert(self, sql, file, size)
+            finally:
+                stats.add_wait(perf_counter() - started)
+
+        def fetchone(self):
+            started = perf_counter()
+            try:
+                return base.fetchone(self)
+            finally:
+                stats.add_wait(perf_counter() - started)
+
+        def fetchall(self):
+            started = perf_counter()
+            try:
+                return base.fetchall(self)
+            finally:
+                stats.add_wait(perf_counter() - started)
+
+        def __iter__(self):
+            # A named cursor goes back to the server for every itersize rows as it is iterated;
+            # a client-side one already holds its rows
+            if self.name is None:
+                return base.__iter__(self)
+            return self.server_rows()
+
+        def server_rows(self):
+            while True:
+                started = perf_counter()
+                try:
+                    row = base.__next__(self)
+                except StopIteration:
+                    return
+                finally:
+                    stats.add_wait(perf_counter() - started)
+                yield row
+
+    return TimingCursor
@@ -0,0 +1,123 @@
+# Dry-run comparison of a grouped import with what kansa already holds. The existing rows are
+# streamed in one query and hash-joined in memory on the key the import probes with, so each
+# grouped ballot is reported as new, unchanged, or conflicting (present under the same key with
+# different contents, which the import would skip) without anything being written. With content
+# hashing on, the nominations are compared the way insert_nominations_hashed writes them instead.
+from collections import Counter
+
+OUTCOMES = ('new', 'unchanged', 'conflicting')
+# A changed ballot under an existing key is rewritten rather than skipped when hashing, and only
+# each member's latest key per category is written at all: the others are skipped
+HASHED_OUTCOMES = ('new', 'unchanged', 'superseded', 'skipped')
+
+EXISTING_NOMINATIONS_QUERY = """
+SELECT to_char(time AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS'), client_ip, person_id, signature, category::text,
+       nominations
+    FROM hugo.nominations WHERE client_ua='User Agent' AND competition='Hugos'
+"""
+
+# Oldest first, so that the last row seen under a key is the one the hashed import would rewrite
+EXISTING_NOMINATIONS_BY_ID_QUERY = EXISTING_NOMINATIONS_QUERY.rstrip() + """ ORDER BY id
+"""
+
+KNOWN_HASHES_QUERY = """
+SELECT person_id, category, hash FROM hugo.nomination_hashes
+"""
+
+EXISTING_VOTES_QUERY = """
+SELECT person_id, signature, category::text, votes
+    FROM hugo.votes WHERE client_ip='127.0.0.1' AND client_ua='User Agent' AND competition='Hugos'
+"""
+
+
+def utc_timestamps(cursor, timestamps):
+    # The server reads each distinct timestamp the way the insert would, in whatever format and
+    # zone it came, so that it compares equal to the stored time
+    cursor.execute("""
+    SELECT stamp, to_char(stamp::timestamptz AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')
+        FROM unnest(%s::text[]) AS stamp
+    """, (list(timestamps),))
+    return dict(cursor.fetchall())
+
+
+def nomination_values(category, nominations):
+    # kansa's jsonb nominations flattened the way NominationGroup holds them
+    return [nomination.get(field, '') for nomination in nominations for field in category.fields]
+
+
+def diff_keys(keys, existing, flatten=None):
+    # keys yields (key, category, contents) in import order and existing yields (key, stored) for
+    # the rows already in kansa; flatten(key, stored) turns stored contents into comparable ones.
+    # Returns a Counter of outcomes per category.
+    wanted = {}
+    repeated = []
+    for key, category, contents in keys:
+        if key in wanted:
+            repeated.append((key, category, contents))
+        else:
+            wanted[key] = (category, contents)
+    matched = {}
+    for key, stored in existing:
+        entry = wanted.get(key)
+        if entry is None or matched.get(key):
+            continue
+        matched[key] = entry[1] == (flatten(key, stored) if flatten else stored)
+    counts = {}
+    for key, (category, contents) in wanted.items():
+        if key not in matched:
+            outcome = 'new'
+        else:
+            outcome = 'unchanged' if matched[key] else 'conflicting'
+        counts.setdefault(category, Counter())[outcome] += 1
+    # Only the first of a repeated key would be written: the rest are skipped like existing rows
+    for key, category, contents in repeated:
+        counts[category]['unchanged' if wanted[key][1] == contents else 'conflicting'] += 1
+    return counts
+
+
+def diff_hashed(keys, known, existing, flatten=None):
+    # keys yields (key, category, contents, digest) in import order, each key ending in
+    # (person_id, signature, category) after its time and client IP; known maps (person_id,
+    # category) to the recorded content hash, and existing yields (key, stored) oldest first. Only
+    # each member's latest ballot per category is written, so any other key is skipped. The latest
+    # is unchanged if its hash is, and otherwise new, unchanged, or superseded (rewritten in
+    # place). Returns a Counter per category.
+    counts = {}
+    latest = {}
+    for key, category, contents, digest in keys:
+        counts.setdefault(category, Counter())
+        ballot = (key[2], key[4])
+        entry = latest.get(ballot)
+        if entry is not None and key[0] < entry[0][0]:
+            counts[category]['skipped'] += 1
+            continue
+        if entry is not None:
+            counts[entry[1]]['skipped'] += 1
+        latest[ballot] = (key, category, contents, digest)
+    changed = {}
+    for ballot, (key, category, contents, digest) in latest.items():
+        if known.get(ballot) == digest:
+            counts[category]['unchanged'] += 1
+        else:
+            changed[key] = (category, contents)
+    matched = {}
+    for key, stored in existing:
+        if key in changed:
+            matched[key] = changed[key][1] == (flatten(key, stored) if flatten else stored)
+    for key, (category, contents) in changed.items():
+        if key not in matched:
+            outcome = 'new'
+        else:
+            outcome = 'unchanged' if matched[key] else 'superseded'
+        counts[category][outcome] += 1
+    return counts
+
+
+def print_diff(counts, outcomes=OUTCOMES):
+    total = Counter()
+    for category, category_counts in counts.items():
+        print(f'{category}: ' + ', '.join(f'{category_counts[outcome]} {outcome}' for outcome in outcomes))
+        total.update(category_counts)
+    print('Total: ' + ', '.join(f'{total[outcome]} {outcome}' for outcome in outcomes))
+    print('Dry run: nothing was written to kansa.')
+    return total
@@ -0,0 +1,235 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from queue import Queue
+
+from .checkpoint import read_checkpoint, write_checkpoint
+from .grouping import NominationGroup
+from .normalise import normalise_nomination
+from .translator import HugoTranslator
+
+NOMINATIONS_QUERY = """
+SELECT
+     users.current_sign_in_ip, users.last_sign_in_ip, users.current_sign_in_at, users.last_sign_in_at,
+     contact.updated_at, users.created_at, contact.created_at, nominations.created_at,
+     reservations.membership_number, users.email, users.sign_in_count,
+     contact.preferred_first_name, contact.preferred_last_name, contact.title, contact.first_name, contact.last_name,
+     categories.name, nominations.field_1, nominations.field_2, nominations.field_3, nominations.id
+     FROM nominations
+     INNER JOIN categories ON categories.id = nominations.category_id
+     INNER JOIN reservations ON reservations.id = nominations.reservation_id
+     INNER JOIN claims on claims.reservation_id = nominations.reservation_id
+     INNER JOIN users ON users.id = claims.user_id
+     INNER JOIN dc_contacts as contact ON contact.claim_id = claims.id
+     WHERE claims.active_to IS NULL{incremental}
+     ORDER BY {order}"""
+
+# Every row of each ballot-category that has had a nomination since the checkpoint, so that
+# the affected keys are regrouped in full rather than from their new rows alone
+INCREMENTAL_FILTER = """
+     AND (nominations.reservation_id, nominations.category_id) IN (
+         SELECT reservation_id, category_id FROM nominations WHERE id > %(since)s)"""
+
+# Every key is one reservation's nominations in one category, so this order delivers each key's
+# rows within one block per reservation and category (still in nomination order). A reservation
+# with several contacts has each nomination once per contact, so the keys in a block interleave:
+# a key is only complete once the next block starts.
+PIPELINE_ORDER = 'nominations.reservation_id, nominations.category_id, nominations.id'
+
+# category, current_sign_in_at, current_sign_in_ip, membership_number, first_name, last_name, field_1..field_3
+NOMINATION_COLUMNS = itemgetter(16, 2, 0, 8, 14, 15, 17, 18, 19)
+
+
+class DisconTranslator(HugoTranslator):
+    stats_name = 'discon3_nominations'
+
+    def __init__(self):
+        super().__init__()
+        self.incremental = None
+        self.pipeline = None
+        self.last_nomination_id = None
+        self.snapshot_store = None
+
+    def refresh_snapshot(self):
+        snapshot = self.open_snapshot()
+        with self.stats.stage('refresh'):
+            try:
+                changed, removed = snapshot.refresh(
+                    self.discon_dbconn, self.config.getint('discon3_db', 'itersize', fallback=2000)
+                )
+            except Exception as err:
+                snapshot.close()
+                print(f"Unable to refresh the snapshot {err}")
+                sys.exit(1)
+        print(f'Refreshed the snapshot: fetched {changed} new or changed nominations, removed {removed}.')
+        self.stats.count('snapshot_fetched', changed)
+        self.stats.count('snapshot_removed', removed)
+        return snapshot
+
+    def fetch_nominations(self, since=None, order='nominations.id'):
+        if self.snapshot_store is not None:
+            # The same rows from the local snapshot, with nominations.id last
+            last_nomination_id = since or 0
+            for row in self.snapshot_store.rows(since, order):
+                if row[9] > last_nomination_id:
+                    last_nomination_id = row[9]
+                yield row[:9]
+            self.last_nomination_id = last_nomination_id
+            return
+        itersize = self.config.getint('discon3_db', 'itersize', fallback=2000)
+        if itersize > 0:
+            # A named cursor leaves the result set on the server and streams it itersize rows
+            # at a time, so grouping starts before the whole join has been transferred.
+            cursor = self.discon_dbconn.cursor(name='discon3_nominations')
+            cursor.itersize = itersize
+        else:
+            cursor = self.discon_dbconn.cursor()
+        with cursor:
+            query = NOMINATIONS_QUERY.format(
+                incremental=INCREMENTAL_FILTER if since is not None else '', order=order
+            )
+            try:
+                cursor.execute(query, {'since': since})
+            except Exception as err:
+                print(f"Unable to run query {err}")
+                sys.exit(1)
+            last_nomination_id = since or 0
+            for row in cursor:
+                if row[20] > last_nomination_id:
+                    last_nomination_id = row[20]
+                yield NOMINATION_COLUMNS(row)
+            self.last_nomination_id = last_nomination_id
+
+    def copy_nominations(self):
+        workers = self.workers or self.config.getint('kansa_db', 'workers', fallback=1)
+        incremental = self.flag(self.incremental, 'sync', 'incremental')
+        since = None
+        if incremental:
+            state_filename = self.config.get('sync', 'state_file', fallback='sync_state.json')
+            since = read_checkpoint(state_filename)
+            print(f'Copying ballots with nominations after ID {since}.')
+        if self.flag(self.snapshot, 'snapshot', 'enabled'):
+            self.snapshot_store = self.refresh_snapshot()
+        try:
+            if self.dry_run:
+                # The checkpoint isn't moved either, so the real copy that follows sees the same rows
+                self.diff_nominations(self.group_nominations(self.fetch_nominations(since), source_stage='fetch'))
+                self.report()
+                return
+            if self.flag(self.pipeline, 'kansa_db', 'pipeline'):
+                additions, mapping = self.copy_nominations_pipelined(workers, since)
+            elif workers > 1:
+                additions, mapping = self.copy_nominations_parallel(workers, since)
+            else:
+                nominations_list = self.group_nominations(self.fetch_nominations(since), source_stage='fetch')
+                mapping = self.canonicalise(nominations_list)
+                additions = self.insert_nominations(nominations_list)
+        finally:
+            if self.snapshot_store is not None:
+                self.snapshot_store.close()
+                self.snapshot_store = None
+        self.write_canonical(mapping)
+        if incremental:
+            write_checkpoint(state_filename, self.last_nomination_id)
+        print(f'Added {additions} records.')
+        self.report()
+
+    def copy_category(self, rows):
+        # Runs in a worker thread: nominations keys never cross categories, so each partition
+        # can be grouped and written in its own transaction on its own kansa connection.
+        dbconn = self.open_connection('kansa_db')
+        try:
+            nominations_list = self.group_nominations(rows)
+            mapping = self.canonicalise(nominations_list)
+            return self.insert_nominations(nominations_list, dbconn), mapping
+        finally:
+            self.release_connection('kansa_db', dbconn)
+
+    def copy_nominations_parallel(self, workers, since=None):
+        categories = self.categories
+        partitions = {}
+        for row in self.stats.timed(self.fetch_nominations(since), 'fetch'):
+            partitions.setdefault(categories[row[0]].code, []).append(row)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                normalised_category: executor.submit(self.copy_category, rows)
+                for normalised_category, rows in partitions.items()
+            }
+            category_results = {
+                normalised_category: future.result() for normalised_category, future in futures.items()
+            }
+        mapping = []
+        for normalised_category, (additions, category_mapping) in category_results.items():
+            print(f'{normalised_category}: added {additions} records.')
+            mapping.extend(category_mapping)
+        return sum(additions for additions, category_mapping in category_results.values()), mapping
+
+    def write_batches(self, batches):
+        # Runs in a writer thread until it takes the end-of-input marker off the queue, borrowing a
+        # pooled connection per batch. After a failure it keeps draining the queue so that the
+        # reader is never left blocked on it.
+        additions = 0
+        failure = None
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if failure is not None:
+                continue
+            try:
+                dbconn = self.open_connection('kansa_db')
+                try:
+                    additions += self.insert_nominations(batch, dbconn)
+                finally:
+                    self.release_connection('kansa_db', dbconn)
+            except BaseException as err:
+                failure = err
+        if failure is not None:
+            raise failure
+        return additions
+
+    def copy_nominations_pipelined(self, workers, since=None):
+        # The reader streams rows in key order and hands every batch_size completed keys to the
+        # writers through a bounded queue, so kansa is written while Discon3 is still being read
+        # and at most queue_depth batches are held in memory at once.
+        categories = self.categories
+        stats = self.stats
+        batch_size = self.config.getint('kansa_db', 'batch_size', fallback=1000)
+        batches = Queue(maxsize=self.config.getint('kansa_db', 'queue_depth', fallback=4))
+        # The canonical stage needs every key, so it holds on to them all when it is enabled
+        canonical = self.flag(self.canonical, 'canonical', 'enabled')
+        nominations_list = {}
+        row_count = 0
+        key_count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            writers = [executor.submit(self.write_batches, batches) for _ in range(workers)]
+            try:
+                batch = {}
+                block = None
+                for row in stats.timed(self.fetch_nominations(since, PIPELINE_ORDER), 'fetch'):
+                    # A full batch is handed over where a new block, of one membership's rows in
+                    # one category, starts, so that no key is split between batches
+                    if (row[3], row[0]) != block:
+                        block = (row[3], row[0])
+                        if len(batch) >= batch_size:
+                            with stats.stage('queue'):
+                                batches.put(batch)
+                            batch = {}
+                    nominations_key, category, values = normalise_nomination(categories, *row)
+                    group = batch.get(nominations_key)
+                    if group is None:
+                        group = batch[nominations_key] = NominationGroup(category)
+                        key_count += 1
+                        if canonical:
+                            nominations_list[nominations_key] = group
+                    group.values.extend(values)
+                    row_count += 1
+                if batch:
+                    batches.put(batch)
+            finally:
+                for writer in writers:
+                    batches.put(None)
+            additions = sum(writer.result() for writer in writers)
+        stats.count('rows', row_count)
+        stats.count('keys', key_count)
+        return additions, self.canonicalise(nominations_list)
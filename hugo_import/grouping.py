@@ -0,0 +1,24 @@
+from hashlib import blake2b
+
+
+class NominationGroup:
+    # One ballot-category. The field names live once on the category schema and the
+    # nominations are kept as a flat list of values, three per nomination, so grouping
+    # allocates no per-nomination containers; they only become dicts when written.
+    __slots__ = ('category', 'values')
+
+    def __init__(self, category):
+        self.category = category
+        self.values = []
+
+    def __len__(self):
+        return len(self.values) // 3
+
+    def expand(self):
+        fields = self.category.fields
+        values = self.values
+        return [dict(zip(fields, values[i:i + 3])) for i in range(0, len(values), 3)]
+
+    def digest(self):
+        # A content hash that is stable across runs and processes, unlike hash()
+        return blake2b('\x1f'.join([self.category.code] + self.values).encode('utf-8'), digest_size=16).digest()
@@ -0,0 +1,56 @@
+import csv
+from operator import itemgetter
+
+from . import chunked, columnar
+from .normalise import NOMINATION_EXPORT_COLUMNS
+from .translator import HugoTranslator
+
+NOMINATION_COLUMNS = itemgetter(*NOMINATION_EXPORT_COLUMNS)
+
+
+class NominationsFileTranslator(HugoTranslator):
+    stats_name = 'nominations_file'
+
+    def read_nominations(self, filename):
+        with open(filename, 'r') as fh:
+            reader = csv.reader(fh)
+            next(reader)   # Skip header row
+            for row in reader:
+                yield NOMINATION_COLUMNS(row)
+
+    def load_nominations(self, filename):
+        if self.flag(self.snapshot, 'snapshot', 'enabled'):
+            # Read from the Discon3 snapshot that main.py keeps, instead of from an export
+            snapshot = self.open_snapshot(read_only=True)
+            try:
+                return self.group_nominations((row[:9] for row in snapshot.rows()), source_stage='parse')
+            finally:
+                snapshot.close()
+        engine = self.file_engine()
+        if engine == 'parallel':
+            with self.stats.stage('parse'):
+                nominations_list, rows = chunked.group_nominations(
+                    self.categories, filename, self.config.getint('file', 'processes', fallback=0)
+                )
+            self.stats.count('rows', rows)
+            self.stats.count('keys', len(nominations_list))
+            return nominations_list
+        if engine == 'pandas':
+            with self.stats.stage('parse'):
+                nominations_list = columnar.group_nominations(self.categories, filename)
+            self.stats.count('rows', sum(len(group) for group in nominations_list.values()))
+            self.stats.count('keys', len(nominations_list))
+            return nominations_list
+        return self.group_nominations(self.read_nominations(filename), source_stage='parse')
+
+    def import_file(self):
+        nominations_list = self.load_nominations(self.config['file']['nominations_filename'])
+        if self.dry_run:
+            self.diff_nominations(nominations_list)
+            self.report()
+            return
+        mapping = self.canonicalise(nominations_list)
+        additions = self.insert_nominations(nominations_list)
+        self.write_canonical(mapping)
+        print(f'Added {additions} records.')
+        self.report()
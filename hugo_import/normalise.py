@@ -0,0 +1,50 @@
+import sys
+from datetime import datetime
+
+DEFAULT_TIMESTAMP = '1970-01-01 00:00:00'
+DEFAULT_IP = '127.0.0.1'
+NO_AWARD = 'No Award'
+NO_AWARD_ID = -1
+
+# Positions in the CSV exports of each import's columns, for the csv module readers, the
+# parallel reader and the pandas engine alike.
+# category, current_sign_in_at, current_sign_in_ip, membership_number, first_name, last_name, field_1..field_3.
+# The data rows of the nominations export have no contact.title column, although the header row does.
+NOMINATION_EXPORT_COLUMNS = (15, 2, 0, 8, 13, 14, 16, 17, 18)
+# category, membership_number, first_name, last_name, finalist, position
+VOTE_EXPORT_COLUMNS = (15, 8, 13, 14, 16, 17)
+
+_intern = sys.intern
+
+
+def normalise_timestamp(current_ts):
+    if isinstance(current_ts, datetime):
+        return _intern(current_ts.strftime('%Y-%m-%d %H:%M:%S UTC'))
+    if not current_ts:
+        return DEFAULT_TIMESTAMP
+    return _intern(current_ts)
+
+
+def normalise_nomination(categories, category, current_ts, current_ip, membership_id, first_name, last_name,
+                         nominations_field_1, nominations_field_2, nominations_field_3):
+    # Shared by the Discon3 and CSV importers: values arrive as database types or as CSV strings.
+    # Strings are interned because the same member details and popular titles repeat on many rows.
+    category = categories[category]
+    nominations_key = (
+        normalise_timestamp(current_ts),
+        _intern(str(current_ip)) if current_ip else DEFAULT_IP,
+        _intern(membership_id) if isinstance(membership_id, str) else membership_id,
+        _intern(first_name) if first_name else '',
+        _intern(last_name) if last_name else '',
+        category.code,
+    )
+    return nominations_key, category, (
+        _intern(nominations_field_1) if nominations_field_1 else '',
+        _intern(nominations_field_2) if nominations_field_2 else '',
+        _intern(nominations_field_3) if nominations_field_3 else '',
+    )
+
+
+def normalise_vote(categories, category, membership_id, first_name, last_name, finalist, position):
+    normalised_category = categories[category].code
+    return (membership_id, first_name, last_name, normalised_category), int(position), (normalised_category, finalist)
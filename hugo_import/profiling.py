@@ -0,0 +1,85 @@
+# The entry points' --profile switch. cProfile records every call made by the main thread and
+# writes them for pstats or snakeviz; a sampling thread takes every thread's Python stack at a
+# fixed interval and writes the counts as collapsed stacks, one "frame;frame;frame count" line
+# per distinct stack, which flamegraph.pl, inferno and speedscope read directly. The sampler
+# costs little enough to leave the timings meaningful, where cProfile can double them. While
+# profiling, every kansa and Discon3 query is timed too, and the import's summary reports the
+# wait per stage as db_wait beside the process's cpu_seconds.
+import cProfile
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILERS = ('both', 'cprofile', 'sample')
+SAMPLE_INTERVAL = 0.005
+
+
+def frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class StackSampler(threading.Thread):
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame))
+                    frame = frame.f_back
+                # Rooted at the thread, so that each worker's samples form their own tower
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self, filename):
+        with open(filename, 'w') as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f'{stack} {count}\n')
+
+
+@contextmanager
+def profiled(prefix, translator=None, profiler='both', interval=SAMPLE_INTERVAL):
+    # Profiles the body when prefix is set, writing prefix.pstats and prefix.collapsed. Only
+    # this process is profiled: the parallel file engine's worker processes are not.
+    if not prefix:
+        yield
+        return
+    if translator is not None:
+        from . import db
+        translator.cursor_factory = db.timing_cursor(translator.stats)
+    sampler = None
+    profile = None
+    if profiler in ('both', 'sample'):
+        sampler = StackSampler(interval)
+        sampler.start()
+    if profiler in ('both', 'cprofile'):
+        profile = cProfile.Profile()
+        profile.enable()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(f'{prefix}.pstats')
+            pstats.Stats(profile, stream=sys.stderr).sort_stats('tottime').print_stats(15)
+            print(f'cProfile statistics written to {prefix}.pstats', file=sys.stderr)
+        if sampler is not None:
+            sampler.stop()
+            sampler.write(f'{prefix}.collapsed')
+            print(f'{sum(sampler.stacks.values())} stack samples written to {prefix}.collapsed', file=sys.stderr)
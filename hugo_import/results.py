@@ -0,0 +1,56 @@
+import csv
+
+# How kansa names No Award in its counts
+NO_AWARD_RESULT = 'No award'
+MIN_ROUNDS = 6
+
+
+def render_results(vote_data):
+    # Yields the heading row, then for each count (race for a position) one row per finalist,
+    # longest-surviving first, followed by a blank separator row. There are always columns for at
+    # least six rounds, as in the original layout; only a longer count widens it.
+    rounds = max([MIN_ROUNDS] + [len(count['rounds']) for count in vote_data])
+    width = rounds + 3
+    yield ('Race for position', 'Finalist') + tuple(f'Round {n}' for n in range(1, rounds + 1)) + ('Runoff',)
+
+    # Finalists that survive equally long are listed in the order they first appear anywhere
+    first_seen = {}
+    for count in vote_data:
+        for round in count['rounds']:
+            for tally_item in round['tally']:
+                first_seen.setdefault(tally_item['finalist'], len(first_seen))
+
+    for count in vote_data:
+        place = count['place']
+        winner = count['winner']
+        # The finalist tested against No Award, when No Award took the place from them
+        tested = count['runoff'].get('finalist', winner)
+        vote_matrix = {}
+        for round in count['rounds']:
+            for tally_item in round['tally']:
+                votes = vote_matrix.get(tally_item['finalist'])
+                if votes is None:
+                    vote_matrix[tally_item['finalist']] = [tally_item['votes']]
+                else:
+                    votes.append(tally_item['votes'])
+        ranking = sorted(
+            vote_matrix,
+            key=lambda finalist: (-len(vote_matrix[finalist]) - (finalist == tested), first_seen[finalist]),
+        )
+        for finalist in ranking:
+            votes = vote_matrix[finalist]
+            vote_row = [place, finalist]
+            vote_row.extend(votes)
+            vote_row.extend([''] * (rounds - len(votes)))
+            if finalist == NO_AWARD_RESULT:
+                vote_row.append(count['runoff']['losses'])
+            elif finalist == tested:
+                vote_row.append(count['runoff']['wins'])
+            else:
+                vote_row.append(0)
+            yield vote_row
+        yield ('',) * width
+
+
+def write_results(vote_data, filehandle):
+    csv.writer(filehandle).writerows(render_results(vote_data))
@@ -0,0 +1,140 @@
+# A local SQLite copy of the Discon3 rows the nominations import reads, keyed by nominations.id.
+# The six-way join is taken apart: members (one row per active claim's contact), categories and
+# nominations are stored separately and joined locally. A refresh ships the small members and
+# categories tables whole, but only an (id, md5) pair per nomination, and then fetches just the
+# nominations that are new or have changed, so most of a run's reads come from local disk.
+import pathlib
+import sqlite3
+
+from .normalise import normalise_timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS members (
+    reservation_id INTEGER NOT NULL, contact_id INTEGER NOT NULL, current_sign_in_ip TEXT, current_sign_in_at TEXT,
+    membership_number INTEGER, first_name TEXT, last_name TEXT, PRIMARY KEY (reservation_id, contact_id));
+CREATE TABLE IF NOT EXISTS nominations (
+    id INTEGER PRIMARY KEY, category_id INTEGER, reservation_id INTEGER, field_1 TEXT, field_2 TEXT, field_3 TEXT,
+    hash BLOB);
+CREATE INDEX IF NOT EXISTS nominations_ballot ON nominations (reservation_id, category_id, id);
+"""
+
+# Discon3 side. Only the member columns that end up in a nominations key are copied.
+CATEGORIES_QUERY = 'SELECT id, name FROM categories'
+
+MEMBERS_QUERY = """
+SELECT claims.reservation_id, contact.id, users.current_sign_in_ip, users.current_sign_in_at,
+     reservations.membership_number, contact.first_name, contact.last_name
+     FROM claims
+     INNER JOIN reservations ON reservations.id = claims.reservation_id
+     INNER JOIN users ON users.id = claims.user_id
+     INNER JOIN dc_contacts as contact ON contact.claim_id = claims.id
+     WHERE claims.active_to IS NULL
+         AND claims.reservation_id IN (SELECT reservation_id FROM nominations)"""
+
+NOMINATION_HASH = "decode(md5(row(category_id, reservation_id, field_1, field_2, field_3)::text), 'hex')"
+
+HASHES_QUERY = f'SELECT id, {NOMINATION_HASH} FROM nominations ORDER BY id'
+
+NOMINATIONS_QUERY = f"""
+SELECT id, category_id, reservation_id, field_1, field_2, field_3, {NOMINATION_HASH}
+     FROM nominations{{changed}}"""
+
+# Local side: the same rows, in the same shape, as the Discon3 query gives DisconTranslator
+ROWS_QUERY = """
+SELECT
+     categories.name, members.current_sign_in_at, members.current_sign_in_ip, members.membership_number,
+     members.first_name, members.last_name, nominations.field_1, nominations.field_2, nominations.field_3,
+     nominations.id
+     FROM nominations
+     INNER JOIN categories ON categories.id = nominations.category_id
+     INNER JOIN members ON members.reservation_id = nominations.reservation_id{incremental}
+     ORDER BY {order}, members.contact_id"""
+
+INCREMENTAL_FILTER = """
+     WHERE (nominations.reservation_id, nominations.category_id) IN (
+         SELECT reservation_id, category_id FROM nominations WHERE id > :since)"""
+
+
+def changes(local, remote):
+    # Merges two (id, hash) streams in id order into the ids that are new or changed remotely
+    # and the ids that have gone
+    changed = []
+    removed = []
+    local = iter(local)
+    remote = iter(remote)
+    local_row = next(local, None)
+    remote_row = next(remote, None)
+    while local_row is not None or remote_row is not None:
+        if remote_row is None or (local_row is not None and local_row[0] < remote_row[0]):
+            removed.append(local_row[0])
+            local_row = next(local, None)
+        elif local_row is None or remote_row[0] < local_row[0]:
+            changed.append(remote_row[0])
+            remote_row = next(remote, None)
+        else:
+            if bytes(local_row[1]) != bytes(remote_row[1]):
+                changed.append(remote_row[0])
+            local_row = next(local, None)
+            remote_row = next(remote, None)
+    return changed, removed
+
+
+class Snapshot:
+
+    def __init__(self, filename, read_only=False):
+        self.filename = filename
+        if read_only:
+            # Reading never creates the file: a missing snapshot fails rather than reading as empty
+            self.dbconn = sqlite3.connect(f'{pathlib.Path(filename).resolve().as_uri()}?mode=ro', uri=True)
+        else:
+            self.dbconn = sqlite3.connect(filename)
+            self.dbconn.executescript(SCHEMA)
+
+    def close(self):
+        self.dbconn.close()
+
+    def refresh(self, discon_dbconn, itersize=2000):
+        # Brings the snapshot up to date with Discon3 in one local transaction, returning the
+        # numbers of nominations fetched and removed
+        local = self.dbconn
+        with discon_dbconn.cursor() as cursor:
+            cursor.execute(CATEGORIES_QUERY)
+            categories = cursor.fetchall()
+            cursor.execute(MEMBERS_QUERY)
+            members = [
+                (reservation_id, contact_id, str(current_ip) if current_ip else None,
+                 normalise_timestamp(current_ts) if current_ts else None, membership_id, first_name, last_name)
+                for reservation_id, contact_id, current_ip, current_ts, membership_id, first_name, last_name
+                in cursor
+            ]
+        with discon_dbconn.cursor(name='snapshot_hashes') as cursor:
+            cursor.itersize = itersize or 2000
+            cursor.execute(HASHES_QUERY)
+            changed, removed = changes(local.execute('SELECT id, hash FROM nominations ORDER BY id'), cursor)
+        fetch_all = local.execute('SELECT 1 FROM nominations LIMIT 1').fetchone() is None
+        with local:
+            local.execute('DELETE FROM categories')
+            local.executemany('INSERT INTO categories VALUES (?, ?)', categories)
+            local.execute('DELETE FROM members')
+            local.executemany('INSERT INTO members VALUES (?, ?, ?, ?, ?, ?, ?)', members)
+            local.executemany('DELETE FROM nominations WHERE id=?', ((nomination_id,) for nomination_id in removed))
+            if changed:
+                with discon_dbconn.cursor(name='snapshot_nominations') as cursor:
+                    cursor.itersize = itersize or 2000
+                    # A first refresh takes the whole table rather than naming every ID
+                    if fetch_all:
+                        cursor.execute(NOMINATIONS_QUERY.format(changed=''))
+                    else:
+                        cursor.execute(NOMINATIONS_QUERY.format(changed=' WHERE id = ANY(%s)'), (changed,))
+                    local.executemany('INSERT OR REPLACE INTO nominations VALUES (?, ?, ?, ?, ?, ?, ?)', (
+                        row[:6] + (bytes(row[6]),) for row in cursor
+                    ))
+        discon_dbconn.rollback()
+        return len(changed), len(removed)
+
+    def rows(self, since=None, order='nominations.id'):
+        # (category, current_ts, current_ip, membership_id, first_name, last_name, field_1, field_2,
+        # field_3, nominations.id) tuples
+        query = ROWS_QUERY.format(incremental=INCREMENTAL_FILTER if since is not None else '', order=order)
+        return self.dbconn.execute(query, {'since': since})
@@ -0,0 +1,59 @@
+# An external merge sort for rows that shouldn't all be held in memory at once: sorted runs of a
+# bounded number of rows are spilled to temporary files, then merged lazily.
+import heapq
+import pickle
+import tempfile
+from itertools import islice
+
+# Rows pickled together when a run is spilled, so that reading one back costs one load per block
+BLOCK_ROWS = 1024
+
+
+class SortedRuns:
+    # Rows are sorted as whole tuples, so a row that should keep its input position among equal
+    # keys needs a sequence number after the key. The input is consumed here; merge() can then
+    # be called any number of times, say to retry a transaction, without reading it again.
+
+    def __init__(self, rows, run_rows=100000):
+        self.rows = 0
+        self.run = None
+        self.files = []
+        rows = iter(rows)
+        while True:
+            run = sorted(islice(rows, run_rows))
+            if not run:
+                break
+            self.rows += len(run)
+            if not self.files and len(run) < run_rows:
+                # Everything fitted in the first run, so there's nothing to spill
+                self.run = run
+                break
+            fh = tempfile.TemporaryFile()
+            for start in range(0, len(run), BLOCK_ROWS):
+                pickle.dump(run[start:start + BLOCK_ROWS], fh, pickle.HIGHEST_PROTOCOL)
+            self.files.append(fh)
+            del run
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for fh in self.files:
+            fh.close()
+
+    def read_run(self, fh):
+        fh.seek(0)
+        while True:
+            try:
+                block = pickle.load(fh)
+            except EOFError:
+                return
+            yield from block
+
+    def merge(self):
+        if self.run is not None:
+            return iter(self.run)
+        return heapq.merge(*(self.read_run(fh) for fh in self.files))
@@ -0,0 +1,96 @@
+import json
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+
+def peak_rss_mib():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ImportStats:
+    # Wall-clock seconds per stage and named counters for one import run. Stages are
+    # accumulated, so a stage entered by several workers reports their combined time.
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.stages = {}
+        self.waits = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_wait(self, seconds):
+        # Time spent waiting on a database, charged to the calling thread's stage
+        stage = self.current_stage() or 'other'
+        with self.lock:
+            self.waits[stage] = self.waits.get(stage, 0.0) + seconds
+
+    def current_stage(self):
+        # The innermost stage the calling thread is in, for attributing work such as queries
+        return getattr(self.local, 'stage', None)
+
+    @contextmanager
+    def stage(self, stage):
+        outer = self.current_stage()
+        self.local.stage = stage
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+            self.local.stage = outer
+
+    def timed(self, rows, stage):
+        # Wraps a row iterator, charging the time spent producing each row to stage
+        perf_counter = time.perf_counter
+        rows = iter(rows)
+        seconds = 0.0
+        try:
+            while True:
+                outer = self.current_stage()
+                self.local.stage = stage
+                started = perf_counter()
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += perf_counter() - started
+                    self.local.stage = outer
+                yield row
+        finally:
+            self.add_time(stage, seconds)
+
+    def count(self, counter, n=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def summary(self):
+        summary = {
+            'import': self.name,
+            'seconds': round(time.perf_counter() - self.started, 6),
+            # Every thread's CPU time in this process; psycopg2 gives up the CPU while it waits
+            'cpu_seconds': round(time.process_time() - self.cpu_started, 6),
+            'stages': {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            'counters': dict(self.counters),
+            'peak_rss_mib': round(peak_rss_mib(), 1),
+        }
+        if self.waits:
+            summary['db_wait'] = {stage: round(seconds, 6) for stage, seconds in self.waits.items()}
+        return summary
+
+    def report(self, filename=None):
+        summary = json.dumps(self.summary())
+        print(summary)
+        if filename:
+            with open(filename, 'a') as fh:
+                fh.write(summary + '\n')
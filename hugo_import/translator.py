@@ -0,0 +1,483 @@
+import configparser
+import csv
+import os
+import sys
+import threading
+import time
+
+from .categories import CATEGORIES, load_categories
+from .diff import (
+    EXISTING_NOMINATIONS_BY_ID_QUERY, EXISTING_NOMINATIONS_QUERY, HASHED_OUTCOMES, KNOWN_HASHES_QUERY, OUTCOMES,
+    diff_hashed, diff_keys, nomination_values, print_diff, utc_timestamps,
+)
+from .grouping import NominationGroup
+from .normalise import normalise_nomination
+from .stats import ImportStats
+
+
+class HugoTranslator:
+    categories = CATEGORIES
+    stats_name = 'import'
+
+    def __init__(self):
+        self.dbconn = None
+        self.discon_dbconn = None
+        self.config = None
+        self.workers = None
+        self.debug = None
+        self.canonical = None
+        self.dry_run = False
+        self.snapshot = None
+        # Set by profiling.profiled to time every query on the connections opened from then on
+        self.cursor_factory = None
+        self.stats = ImportStats(self.stats_name)
+        self.pools = {}
+        self.pools_lock = threading.Lock()
+        self.hashes_ready = False
+        self.hashes_lock = threading.Lock()
+
+    def read_config(self, filename='config.ini'):
+        config = configparser.ConfigParser()
+        config.read(filename)
+        self.config = config
+        # Another convention's import names its own categories in a schema file
+        schema_filename = config.get('import', 'categories', fallback='')
+        if schema_filename:
+            self.categories = load_categories(schema_filename)
+
+    def open_connection(self, section):
+        # Connections come from a pool per database, sized for the main connection plus each
+        # worker's, with room for each of those to be replaced while a lost one is still held
+        from . import db
+        params = self.config[section]
+        with self.pools_lock:
+            if section not in self.pools:
+                workers = self.workers or self.config.getint('kansa_db', 'workers', fallback=1)
+                self.pools[section] = db.pool(params, params.getint('pool_size', fallback=2 * (workers + 1)))
+        dbconn = db.getconn(self.pools[section], params)
+        if self.cursor_factory is not None:
+            dbconn.cursor_factory = self.cursor_factory
+        return dbconn
+
+    def release_connection(self, section, dbconn):
+        self.pools[section].putconn(dbconn, close=bool(dbconn.closed))
+
+    def close(self):
+        # Closes every pooled connection, for a process that goes on to run other imports
+        for connection_pool in self.pools.values():
+            connection_pool.closeall()
+
+    def transaction(self, operation, dbconn=None):
+        # Runs operation(dbconn) as one kansa transaction. After a transient failure it is rolled
+        # back and run again from the start, after an exponential backoff and on a fresh
+        # connection if the old one was lost, so one dropped connection doesn't end the import.
+        from . import db
+        params = self.config['kansa_db']
+        retries = params.getint('retries', fallback=3)
+        delay = params.getfloat('retry_delay', fallback=1.0)
+        main = dbconn is None
+        dbconn = dbconn or self.dbconn
+        replacement = None
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    return operation(dbconn)
+                except db.TRANSIENT_ERRORS as err:
+                    if attempt == retries:
+                        print(f"Unable to run query {err}")
+                        sys.exit(1)
+                    print(f"Unable to run query, retrying in {delay * 2 ** attempt:g}s: {err}")
+                    self.stats.count('retries')
+                time.sleep(delay * 2 ** attempt)
+                if dbconn.closed:
+                    # A lost main connection is replaced for good; a worker's stays with the worker,
+                    # which releases it, and the replacement is only borrowed for the retries
+                    if main:
+                        self.release_connection('kansa_db', dbconn)
+                        dbconn = self.dbconn = self.open_connection('kansa_db')
+                    else:
+                        if replacement is not None:
+                            self.release_connection('kansa_db', replacement)
+                        dbconn = replacement = self.open_connection('kansa_db')
+                else:
+                    dbconn.rollback()
+        finally:
+            if replacement is not None:
+                self.release_connection('kansa_db', replacement)
+
+    def connect_db(self):
+        self.dbconn = self.open_connection('kansa_db')
+
+    def connect_discon_db(self):
+        self.discon_dbconn = self.open_connection('discon3_db')
+
+    def flag(self, override, section, option):
+        # A command line switch wins over the config file when it was given
+        if override is not None:
+            return override
+        return self.config.getboolean(section, option, fallback=False)
+
+    def report(self):
+        self.stats.report(self.config.get('import', 'stats_file', fallback=None))
+
+    def open_snapshot(self, read_only=False):
+        from .snapshot import Snapshot
+        filename = self.config.get('snapshot', 'filename', fallback='discon3.sqlite')
+        if read_only and not os.path.exists(filename):
+            print(f'Snapshot {filename} not found: refresh it with main.py --snapshot first.')
+            sys.exit(1)
+        return Snapshot(filename, read_only)
+
+    def file_engine(self):
+        engine = self.config.get('file', 'engine', fallback='csv')
+        if engine == 'parallel':
+            return engine
+        if engine in ('auto', 'pandas'):
+            from . import columnar
+            if columnar.available():
+                return 'pandas'
+            if engine == 'pandas':
+                print('pandas is not installed: reading with the csv module instead.')
+        return 'csv'
+
+    def canonicalise(self, nominations_list):
+        # Optional stage: cluster equivalent free-text entries alongside the insert
+        if not self.flag(self.canonical, 'canonical', 'enabled'):
+            return []
+        from .canonical import canonical_mapping
+        threshold = self.config.getfloat('canonical', 'threshold', fallback=0.6)
+        with self.stats.stage('canonical'):
+            mapping = list(canonical_mapping(nominations_list, threshold))
+        self.stats.count('canonical_values', len(mapping))
+        return mapping
+
+    def write_canonical(self, mapping):
+        if not self.flag(self.canonical, 'canonical', 'enabled'):
+            return
+        filename = self.config.get('canonical', 'mapping_file', fallback='canonical.csv')
+        with open(filename, 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(('category', 'field', 'canonical_id', 'canonical', 'value', 'nominations'))
+            writer.writerows(mapping)
+        print(f'Wrote {len(mapping)} canonical mappings to {filename}.')
+
+    def group_nominations(self, rows, source_stage=None):
+        # rows are (category, current_ts, current_ip, membership_id, first_name, last_name,
+        # field_1, field_2, field_3) tuples, whichever source they were read from
+        categories = self.categories
+        stats = self.stats
+        perf_counter = time.perf_counter
+        if source_stage is not None:
+            rows = stats.timed(rows, source_stage)
+            source_seconds = stats.stages.get(source_stage, 0.0)
+        normalise_seconds = 0.0
+        row_count = 0
+        started = perf_counter()
+        nominations_list = {}
+        for row in rows:
+            normalise_started = perf_counter()
+            nominations_key, category, values = normalise_nomination(categories, *row)
+            normalise_seconds += perf_counter() - normalise_started
+            group = nominations_list.get(nominations_key)
+            if group is None:
+                group = nominations_list[nominations_key] = NominationGroup(category)
+            group.values.extend(values)
+            row_count += 1
+        group_seconds = perf_counter() - started - normalise_seconds
+        if source_stage is not None:
+            group_seconds -= stats.stages.get(source_stage, 0.0) - source_seconds
+        stats.add_time('normalise', normalise_seconds)
+        stats.add_time('group', group_seconds)
+        stats.count('rows', row_count)
+        stats.count('keys', len(nominations_list))
+        return nominations_list
+
+    def report_diff(self, counts, outcomes=OUTCOMES):
+        total = print_diff(counts, outcomes)
+        for outcome in outcomes:
+            self.stats.count(outcome, total[outcome])
+
+    def diff_nominations(self, nominations_list):
+        # The dry run of insert_nominations: one read of hugo.nominations, nothing written
+        from .db import query_failed
+        by_code = self.categories.by_code
+        hashed = self.config.getboolean('kansa_db', 'content_hash', fallback=False)
+
+        def flatten(key, nominations):
+            return nomination_values(by_code[key[4]], nominations)
+
+        def diff(dbconn):
+            try:
+                with dbconn.cursor() as cursor:
+                    timestamps = utc_timestamps(cursor, {nominations_key[0] for nominations_key in nominations_list})
+                    known = {}
+                    if hashed:
+                        # The dry run doesn't create hugo.nomination_hashes: before the first hashed
+                        # import there are no recorded hashes
+                        cursor.execute("SELECT to_regclass('hugo.nomination_hashes') IS NOT NULL")
+                        if cursor.fetchone()[0]:
+                            cursor.execute(KNOWN_HASHES_QUERY)
+                            known = {(person_id, category): bytes(digest) for person_id, category, digest in cursor}
+                keys = (
+                    ((timestamps[current_ts], current_ip, int(membership_id), f"{first_name} {last_name}",
+                      normalised_category), normalised_category, group)
+                    for (current_ts, current_ip, membership_id, first_name, last_name, normalised_category), group
+                    in nominations_list.items()
+                )
+                # A named cursor streams the existing rows rather than holding them all client-side
+                with dbconn.cursor(name='existing_nominations') as cursor:
+                    cursor.execute(EXISTING_NOMINATIONS_BY_ID_QUERY if hashed else EXISTING_NOMINATIONS_QUERY)
+                    existing = (((time, client_ip, person_id, signature, category), nominations)
+                                for time, client_ip, person_id, signature, category, nominations in cursor)
+                    if hashed:
+                        counts = diff_hashed(
+                            ((key, category, group.values, group.digest()) for key, category, group in keys),
+                            known, existing, flatten,
+                        )
+                    else:
+                        counts = diff_keys(
+                            ((key, category, group.values) for key, category, group in keys), existing, flatten
+                        )
+            except Exception as err:
+                query_failed(err)
+            dbconn.rollback()
+            return counts
+
+        with self.stats.stage('diff'):
+            counts = self.transaction(diff)
+        self.report_diff(counts, HASHED_OUTCOMES if hashed else OUTCOMES)
+
+    def insert_nominations(self, nominations_list, dbconn=None):
+        if self.config.getboolean('kansa_db', 'content_hash', fallback=False):
+            self.create_hashes(dbconn)
+            insert = self.insert_nominations_hashed
+        elif self.config.getboolean('kansa_db', 'bulk_insert', fallback=True):
+            insert = self.insert_nominations_bulk
+        else:
+            insert = self.insert_nominations_by_row
+        return self.transaction(lambda dbconn: insert(nominations_list, dbconn), dbconn)
+
+    def insert_nominations_by_row(self, nominations_list, dbconn=None):
+        from .db import Json, prepare, query_failed
+        kansa_dbconn = dbconn or self.dbconn
+        stats = self.stats
+        debug = self.flag(self.debug, 'import', 'debug')
+        additions = 0
+        with kansa_dbconn.cursor() as cursor:
+            # Planned once per session rather than once per key
+            try:
+                prepare(cursor, 'nominations_probe', """
+                SELECT id FROM hugo.nominations
+                    WHERE time=$1 AND client_ip=$2 AND client_ua='User Agent' AND person_id=$3
+                        AND signature=$4 AND competition='Hugos' AND category=$5
+                """)
+                prepare(cursor, 'nominations_insert', """
+                INSERT INTO hugo.nominations
+                    (time, client_ip, client_ua, person_id, signature, competition, category, nominations)
+                    VALUES ($1, $2, 'User Agent', $3, $4, 'Hugos', $5, $6::jsonb[])
+                """)
+            except Exception as err:
+                query_failed(err)
+            for nominations_key in nominations_list:
+                current_ts, current_ip, membership_id, first_name, last_name, normalised_category = nominations_key
+                with stats.stage('probe'):
+                    try:
+                        cursor.execute('EXECUTE nominations_probe (%s, %s, %s, %s, %s)', (
+                            current_ts, current_ip, membership_id, f"{first_name} {last_name}",
+                            normalised_category
+                        ))
+                    except Exception as err:
+                        query_failed(err)
+                    existing = cursor.fetchone()
+                if debug:
+                    print(nominations_key, nominations_list[nominations_key].expand())
+                if existing is not None:
+                    if debug:
+                        print("Entry already exists: skipping...")
+                    continue
+                nominations = [Json(x) for x in nominations_list[nominations_key].expand()]
+                with stats.stage('insert'):
+                    try:
+                        cursor.execute('EXECUTE nominations_insert (%s, %s, %s, %s, %s, %s::jsonb[])', (
+                            current_ts, current_ip, membership_id, f"{first_name} {last_name}",
+                            normalised_category, nominations
+                        ))
+                    except Exception as err:
+                        query_failed(err)
+                additions += 1
+            with stats.stage('commit'):
+                kansa_dbconn.commit()
+            cursor.close()
+        stats.count('inserted', additions)
+        stats.count('skipped', len(nominations_list) - additions)
+        return additions
+
+    def stage_nominations(self, cursor, nominations_list, hashed=False):
+        # Loads every grouped key, in order and with its content hash if wanted, into a temporary
+        # nominations_import table for a single merge into hugo.nominations
+        from .db import Json, execute_values, query_failed
+        batch_size = self.config.getint('kansa_db', 'batch_size', fallback=1000)
+        query = """
+        CREATE TEMPORARY TABLE nominations_import ON COMMIT DROP AS
+            SELECT 0 AS ord, time, client_ip, person_id, signature, category, nominations, NULL::bytea AS hash
+                FROM hugo.nominations WITH NO DATA
+        """
+        try:
+            cursor.execute(query)
+        except Exception as err:
+            query_failed(err)
+        query = """
+        INSERT INTO nominations_import (ord, time, client_ip, person_id, signature, category, nominations, hash)
+            VALUES %s
+        """
+        values = (
+            (position, current_ts, current_ip, membership_id, f"{first_name} {last_name}", normalised_category,
+             [Json(x) for x in group.expand()], group.digest() if hashed else None)
+            for position, ((current_ts, current_ip, membership_id, first_name, last_name, normalised_category),
+                           group) in enumerate(nominations_list.items())
+        )
+        try:
+            execute_values(cursor, query, values, template='(%s, %s, %s, %s, %s, %s, %s::jsonb[], %s)',
+                           page_size=batch_size)
+        except Exception as err:
+            query_failed(err)
+
+    def insert_nominations_bulk(self, nominations_list, dbconn=None):
+        from .db import query_failed
+        kansa_dbconn = dbconn or self.dbconn
+        # Load every grouped key into a temporary table, then let the server drop the ones
+        # that already exist with a single anti-join instead of a SELECT per key.
+        stats = self.stats
+        if self.flag(self.debug, 'import', 'debug'):
+            for nominations_key, group in nominations_list.items():
+                print(nominations_key, group.expand())
+        with kansa_dbconn.cursor() as cursor:
+            with stats.stage('load'):
+                self.stage_nominations(cursor, nominations_list)
+            query = """
+            INSERT INTO hugo.nominations
+                (time, client_ip, client_ua, person_id, signature, competition, category, nominations)
+                SELECT time, client_ip, 'User Agent', person_id, signature, 'Hugos', category, nominations
+                    FROM (
+                        SELECT DISTINCT ON (time, client_ip, person_id, signature, category) *
+                            FROM nominations_import
+                            ORDER BY time, client_ip, person_id, signature, category, ord
+                    ) AS import
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM hugo.nominations AS existing
+                            WHERE existing.time=import.time AND existing.client_ip=import.client_ip
+                                AND existing.client_ua='User Agent' AND existing.person_id=import.person_id
+                                AND existing.signature=import.signature AND existing.competition='Hugos'
+                                AND existing.category=import.category
+                    )
+                    ORDER BY ord
+            """
+            with stats.stage('merge'):
+                try:
+                    cursor.execute(query)
+                except Exception as err:
+                    query_failed(err)
+            additions = cursor.rowcount
+            with stats.stage('commit'):
+                kansa_dbconn.commit()
+            cursor.close()
+        stats.count('inserted', additions)
+        stats.count('skipped', len(nominations_list) - additions)
+        return additions
+
+    def create_hashes(self, dbconn=None):
+        # The content hash of each member's current ballot in each category, kept beside
+        # hugo.nominations rather than in it, as kansa owns that table. Created once per run, before
+        # any worker's transaction needs it.
+        from .db import query_failed
+        with self.hashes_lock:
+            if self.hashes_ready:
+                return
+
+            def create(dbconn):
+                with dbconn.cursor() as cursor:
+                    try:
+                        cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS hugo.nomination_hashes (
+                            person_id integer NOT NULL, category text NOT NULL, nomination_id integer NOT NULL,
+                            hash bytea NOT NULL, PRIMARY KEY (person_id, category))
+                        """)
+                    except Exception as err:
+                        query_failed(err)
+                dbconn.commit()
+
+            self.transaction(create, dbconn)
+            self.hashes_ready = True
+
+    def insert_nominations_hashed(self, nominations_list, dbconn=None):
+        # Only ballots whose content hash differs from the one recorded for that member and
+        # category are written, so a re-sync after members have merely signed in again writes
+        # nothing. A changed ballot rewrites the row with the same key if there is one, as kansa
+        # would otherwise keep the old contents, and is inserted as a new row if not; kansa takes
+        # each member's latest row per category as their ballot, so either supersedes the old one.
+        from .db import query_failed
+        kansa_dbconn = dbconn or self.dbconn
+        stats = self.stats
+        if self.flag(self.debug, 'import', 'debug'):
+            for nominations_key, group in nominations_list.items():
+                print(nominations_key, group.expand())
+        with kansa_dbconn.cursor() as cursor:
+            with stats.stage('load'):
+                self.stage_nominations(cursor, nominations_list, hashed=True)
+            query = """
+            WITH latest AS (
+                SELECT DISTINCT ON (person_id, category) * FROM nominations_import
+                    ORDER BY person_id, category, time DESC, ord DESC
+            ), changed AS (
+                SELECT latest.* FROM latest
+                    LEFT JOIN hugo.nomination_hashes AS known
+                        ON known.person_id=latest.person_id AND known.category=latest.category::text
+                    WHERE known.hash IS DISTINCT FROM latest.hash
+            ), matched AS (
+                SELECT DISTINCT ON (changed.ord) changed.ord, existing.id,
+                       existing.nominations=changed.nominations AS same
+                    FROM changed
+                    INNER JOIN hugo.nominations AS existing
+                        ON existing.time=changed.time AND existing.client_ip=changed.client_ip
+                            AND existing.client_ua='User Agent' AND existing.person_id=changed.person_id
+                            AND existing.signature=changed.signature AND existing.competition='Hugos'
+                            AND existing.category=changed.category
+                    ORDER BY changed.ord, existing.id DESC
+            ), superseded AS (
+                UPDATE hugo.nominations AS existing SET nominations=changed.nominations
+                    FROM matched INNER JOIN changed ON changed.ord=matched.ord
+                    WHERE existing.id=matched.id AND NOT matched.same
+                    RETURNING existing.id
+            ), inserted AS (
+                INSERT INTO hugo.nominations
+                    (time, client_ip, client_ua, person_id, signature, competition, category, nominations)
+                    SELECT time, client_ip, 'User Agent', person_id, signature, 'Hugos', category, nominations
+                        FROM changed
+                        WHERE NOT EXISTS (SELECT 1 FROM matched WHERE matched.ord=changed.ord)
+                        ORDER BY ord
+                    RETURNING id, person_id, category
+            ), recorded AS (
+                INSERT INTO hugo.nomination_hashes (person_id, category, nomination_id, hash)
+                    SELECT changed.person_id, changed.category::text, coalesce(matched.id, inserted.id), changed.hash
+                        FROM changed
+                        LEFT JOIN matched ON matched.ord=changed.ord
+                        LEFT JOIN inserted
+                            ON inserted.person_id=changed.person_id AND inserted.category=changed.category
+                    ON CONFLICT (person_id, category) DO UPDATE
+                        SET nomination_id=excluded.nomination_id, hash=excluded.hash
+            )
+            SELECT (SELECT count(*) FROM inserted), (SELECT count(*) FROM superseded)
+            """
+            with stats.stage('merge'):
+                try:
+                    cursor.execute(query)
+                except Exception as err:
+                    query_failed(err)
+                additions, superseded = cursor.fetchone()
+            with stats.stage('commit'):
+                kansa_dbconn.commit()
+            cursor.close()
+        stats.count('inserted', additions)
+        stats.count('superseded', superseded)
+        stats.count('skipped', len(nominations_list) - additions - superseded)
+        return additions
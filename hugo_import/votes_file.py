@@ -0,0 +1,423 @@
+import csv
+from itertools import count, groupby
+from operator import itemgetter
+from pprint import pprint
+
+from . import columnar
+from .copying import CopyRows
+from .diff import EXISTING_VOTES_QUERY, diff_keys
+from .normalise import NO_AWARD, NO_AWARD_ID, VOTE_EXPORT_COLUMNS, normalise_vote
+from .sorting import SortedRuns
+from .translator import HugoTranslator
+
+VOTE_COLUMNS = itemgetter(*VOTE_EXPORT_COLUMNS)
+# The ballot a streamed row belongs to: membership_number, first_name, last_name, category code
+VOTE_KEY = itemgetter(0, 1, 2, 3)
+
+
+class VotesFileTranslator(HugoTranslator):
+    stats_name = 'votes_file'
+
+    def __init__(self):
+        super().__init__()
+        self.stream = None
+
+    def read_finalists(self, filename):
+        # A finalists CSV with category (award name or code) and title columns, and optionally
+        # subtitle and sortindex; without a sortindex, finalists are numbered in the order listed
+        categories = self.categories
+        finalists = []
+        listed = {}
+        with open(filename, 'r') as fh:
+            for row in csv.DictReader(fh):
+                category = categories.by_code.get(row['category']) or categories[row['category']]
+                listed[category.code] = listed.get(category.code, 0) + 1
+                finalists.append((category.code, row['title'], int(row.get('sortindex') or listed[category.code]),
+                                  row.get('subtitle') or ''))
+        return finalists
+
+    def finalist_rows(self, categorised_finalists):
+        # (category, title, sortindex, subtitle) rows: those in [file] finalists_filename as
+        # listed, and the other finalists the ballots name, numbered alphabetically after them
+        # so that the same ballots always give the same order
+        filename = self.config.get('file', 'finalists_filename', fallback='')
+        listed = []
+        seen = set()
+        last = {}
+        for category, title, sortindex, subtitle in self.read_finalists(filename) if filename else ():
+            if (category, title) not in seen:
+                seen.add((category, title))
+                listed.append((category, title, sortindex, subtitle))
+                last[category] = max(last.get(category, 0), sortindex)
+        derived = []
+        for category, title in sorted(
+                (x for x in categorised_finalists if x not in seen), key=lambda x: (x[0], x[1].casefold(), x[1])):
+            last[category] = last.get(category, 0) + 1
+            derived.append((category, title, last[category], ''))
+        return listed, derived
+
+    def resolve_finalists(self, categorised_finalists, dbconn=None, create=True):
+        # Every finalist is looked up, and the missing ones created, in a single statement before
+        # any ballot is read. A finalists file's sortindex and subtitle also overwrite those of
+        # the finalists already in kansa; those only named by ballots are left as they are.
+        # Without create nothing is written and the missing finalists resolve to None.
+        categorised_finalists_list = {}
+        listed, derived = self.finalist_rows(categorised_finalists)
+        if not listed and not derived:
+            return categorised_finalists_list
+        from .db import Json, execute_values, query_failed
+        with (dbconn or self.dbconn).cursor() as cursor:
+            if not create:
+                query = """
+                SELECT finalists.category::text, finalists.title, finalists.id FROM hugo.finalists AS finalists
+                    INNER JOIN (VALUES %s) AS wanted (category, title)
+                        ON finalists.category::text=wanted.category AND finalists.title=wanted.title
+                    WHERE finalists.competition='Hugos'
+                    ORDER BY finalists.id
+                """
+                try:
+                    rows = execute_values(cursor, query, [row[:2] for row in listed + derived], fetch=True)
+                except Exception as err:
+                    query_failed(err)
+                for category, title, finalist_id in rows:
+                    categorised_finalists_list.setdefault((category, title), finalist_id)
+                print(f'Found {len(categorised_finalists_list)} existing finalists.')
+                missing_finalists = [row[:2] for row in listed + derived if row[:2] not in categorised_finalists_list]
+                categorised_finalists_list.update(dict.fromkeys(missing_finalists))
+                print(f'{len(missing_finalists)} finalists are not in kansa yet.')
+                return categorised_finalists_list
+            # Typed as hugo.finalists rows, so that category takes the column's own type
+            query = """
+            WITH wanted AS (
+                SELECT category, title, sortindex, subtitle, true AS listed
+                    FROM jsonb_populate_recordset(NULL::hugo.finalists, %(listed)s)
+                UNION ALL
+                SELECT category, title, sortindex, subtitle, false
+                    FROM jsonb_populate_recordset(NULL::hugo.finalists, %(derived)s)
+            ), existing AS (
+                SELECT DISTINCT ON (finalists.category, finalists.title)
+                       finalists.id, finalists.category, finalists.title
+                    FROM hugo.finalists AS finalists
+                    INNER JOIN wanted ON finalists.category=wanted.category AND finalists.title=wanted.title
+                    WHERE finalists.competition='Hugos'
+                    ORDER BY finalists.category, finalists.title, finalists.id
+            ), updated AS (
+                UPDATE hugo.finalists AS finalists SET sortindex=wanted.sortindex, subtitle=wanted.subtitle
+                    FROM existing
+                    INNER JOIN wanted ON wanted.category=existing.category AND wanted.title=existing.title
+                    WHERE finalists.id=existing.id AND wanted.listed
+                        AND (finalists.sortindex IS DISTINCT FROM wanted.sortindex
+                             OR finalists.subtitle IS DISTINCT FROM wanted.subtitle)
+                    RETURNING finalists.id
+            ), inserted AS (
+                INSERT INTO hugo.finalists (competition, category, sortindex, title, subtitle)
+                    SELECT 'Hugos', category, sortindex, title, subtitle FROM wanted
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM existing
+                                WHERE existing.category=wanted.category AND existing.title=wanted.title
+                        )
+                        ORDER BY category, sortindex
+                    RETURNING id, category, title
+            )
+            SELECT category::text, title, id, added, (SELECT count(*) FROM updated) FROM (
+                SELECT category, title, id, false AS added FROM existing
+                UNION ALL
+                SELECT category, title, id, true FROM inserted
+            ) AS resolved
+            """
+            columns = ('category', 'title', 'sortindex', 'subtitle')
+            try:
+                cursor.execute(query, {
+                    'listed': Json([dict(zip(columns, row)) for row in listed]),
+                    'derived': Json([dict(zip(columns, row)) for row in derived]),
+                })
+            except Exception as err:
+                query_failed(err)
+            added = updated = 0
+            for category, title, finalist_id, is_added, updated in cursor:
+                categorised_finalists_list[(category, title)] = finalist_id
+                added += is_added
+            cursor.close()
+        print(f'Found {len(categorised_finalists_list) - added} existing finalists.')
+        if updated:
+            print(f'Updated the sortindex or subtitle of {updated} finalists.')
+        print(f'Added {added} new finalists.')
+        return categorised_finalists_list
+
+    def read_ranks(self, filename):
+        categories = self.categories
+        with open(filename, 'r') as fh:
+            reader = csv.reader(fh)
+            next(reader)   # Skip header row
+            return [normalise_vote(categories, *VOTE_COLUMNS(row)) for row in reader]
+
+    def load_ranks(self, filename):
+        if self.file_engine() == 'pandas':
+            return columnar.read_ranks(self.categories, filename)
+        return self.read_ranks(filename)
+
+    def read_vote_rows(self, filename):
+        # (membership_number, first_name, last_name, category code, row number, finalist, position):
+        # sorted as they are, rows come out in ballot order and each ballot's in file order
+        categories = self.categories
+        with open(filename, 'r') as fh:
+            reader = csv.reader(fh)
+            next(reader)   # Skip header row
+            for row_number, row in enumerate(reader):
+                category, membership_id, first_name, last_name, finalist, position = VOTE_COLUMNS(row)
+                yield membership_id, first_name, last_name, categories[category].code, row_number, finalist, position
+
+    def sort_votes(self, filename):
+        # One pass over the file collects the distinct finalists, which need IDs before any ballot
+        # can be written, and sorts the rows into ballot order, sort_rows at a time on disk
+        categorised_finalists = {}
+
+        def rows():
+            for row in self.read_vote_rows(filename):
+                if row[5] != NO_AWARD:
+                    categorised_finalists[(row[3], row[5])] = None
+                yield row
+
+        runs = SortedRuns(rows(), self.config.getint('file', 'sort_rows', fallback=100000))
+        return list(categorised_finalists), runs
+
+    def stream_ballots(self, rows, finalist_ids):
+        # rows arrive in ballot order, so each ballot is ranked and handed on as soon as its last
+        # row has been read, and only one is held at a time
+        debug = self.flag(self.debug, 'import', 'debug')
+        ballots = 0
+        for votes_key, ballot_rows in groupby(rows, key=VOTE_KEY):
+            finalists = {}
+            for row in ballot_rows:
+                normalised_category, finalist, position = row[3], row[5], row[6]
+                if finalist == NO_AWARD:
+                    finalists[int(position)] = NO_AWARD_ID
+                else:
+                    finalists[int(position)] = finalist_ids[(normalised_category, finalist)]
+            rankings = [finalists[rank] for rank in sorted(finalists)]
+            if debug:
+                print(votes_key, rankings)
+            ballots += 1
+            yield votes_key, rankings
+        self.stats.count('keys', ballots)
+
+    def group_votes(self, ranks, finalist_ids):
+        # Collect each voter's positions, mapping (category, finalist) pairs through finalist_ids
+        votes_list = {}
+        for votes_key, position, categorised_finalist in ranks:
+            if categorised_finalist[1] == NO_AWARD:
+                finalist_id = NO_AWARD_ID
+            else:
+                finalist_id = finalist_ids[categorised_finalist]
+            if votes_key in votes_list:
+                votes_list[votes_key][position] = finalist_id
+            else:
+                votes_list[votes_key] = {
+                    position: finalist_id
+                }
+        return votes_list
+
+    def rank_votes(self, votes_list):
+        return {
+            votes_key: [finalists[rank] for rank in sorted(finalists)]
+            for votes_key, finalists in votes_list.items()
+        }
+
+    def import_file(self):
+        if self.flag(self.stream, 'file', 'stream_votes') and not self.dry_run:
+            return self.import_file_streamed()
+        stats = self.stats
+        filename = self.config['file']['votes_filename']
+        with stats.stage('parse'):
+            ranks = self.load_ranks(filename)
+            categorised_finalists = dict.fromkeys(
+                categorised_finalist for votes_key, position, categorised_finalist in ranks
+                if categorised_finalist[1] != NO_AWARD
+            )
+        stats.count('rows', len(ranks))
+        if self.dry_run:
+            with stats.stage('resolve'):
+                categorised_finalists_list = self.transaction(
+                    lambda dbconn: self.resolve_finalists(list(categorised_finalists), dbconn, create=False)
+                )
+            with stats.stage('group'):
+                votes_rankings = self.rank_votes(self.group_votes(ranks, categorised_finalists_list))
+            self.diff_votes(votes_rankings)
+            self.report()
+            return
+
+        def load(dbconn):
+            # Finalists and ballots are written in one transaction, committed by the insert below
+            with stats.stage('resolve'):
+                categorised_finalists_list = self.resolve_finalists(list(categorised_finalists), dbconn)
+            with stats.stage('group'):
+                votes_list = self.group_votes(ranks, categorised_finalists_list)
+                votes_rankings = self.rank_votes(votes_list)
+            if self.flag(self.debug, 'import', 'debug'):
+                pprint(votes_list)
+            return (len(categorised_finalists_list), len(votes_rankings),
+                    self.insert_votes(votes_rankings.items(), dbconn))
+
+        finalists, keys, additions = self.transaction(load)
+        stats.count('finalists', finalists)
+        stats.count('keys', keys)
+        print(f'Added {additions} records.')
+        self.report()
+
+    def import_file_streamed(self):
+        # Only one ballot is held at a time once the rows are sorted: each is written as soon as
+        # its last row has been read back
+        stats = self.stats
+        with stats.stage('sort'):
+            categorised_finalists, runs = self.sort_votes(self.config['file']['votes_filename'])
+        stats.count('rows', runs.rows)
+
+        def load(dbconn):
+            with stats.stage('resolve'):
+                categorised_finalists_list = self.resolve_finalists(categorised_finalists, dbconn)
+            ballots = self.stream_ballots(runs.merge(), categorised_finalists_list)
+            return len(categorised_finalists_list), self.insert_votes(stats.timed(ballots, 'stream'), dbconn)
+
+        with runs:
+            finalists, additions = self.transaction(load)
+        stats.count('finalists', finalists)
+        print(f'Added {additions} records.')
+        self.report()
+
+    def diff_votes(self, votes_rankings):
+        # The dry run of insert_votes: one read of hugo.votes, nothing written. Ballots naming a
+        # finalist kansa doesn't have yet can't be unchanged.
+        from .db import query_failed
+
+        def diff(dbconn):
+            keys = (
+                ((int(membership_id), f"{first_name} {last_name}", normalised_category), normalised_category, rankings)
+                for (membership_id, first_name, last_name, normalised_category), rankings in votes_rankings.items()
+            )
+            try:
+                with dbconn.cursor(name='existing_votes') as cursor:
+                    cursor.execute(EXISTING_VOTES_QUERY)
+                    counts = diff_keys(
+                        keys,
+                        (((person_id, signature, category), votes) for person_id, signature, category, votes in cursor)
+                    )
+            except Exception as err:
+                query_failed(err)
+            dbconn.rollback()
+            return counts
+
+        with self.stats.stage('diff'):
+            counts = self.transaction(diff)
+        self.report_diff(counts)
+
+    def insert_votes(self, ballots, dbconn=None):
+        # ballots are (votes_key, rankings) pairs, which may be streamed
+        if self.config.getboolean('kansa_db', 'bulk_insert', fallback=True):
+            return self.insert_votes_bulk(ballots, dbconn)
+        return self.insert_votes_by_row(ballots, dbconn)
+
+    def insert_votes_by_row(self, ballots, dbconn=None):
+        from .db import prepare, query_failed
+        kansa_dbconn = dbconn or self.dbconn
+        stats = self.stats
+        additions = 0
+        ballot_count = 0
+        with kansa_dbconn.cursor() as cursor:
+            # Planned once per session rather than once per ballot
+            try:
+                prepare(cursor, 'votes_probe', """
+                SELECT id FROM hugo.votes
+                    WHERE client_ip='127.0.0.1' AND client_ua='User Agent' AND competition='Hugos'
+                        AND person_id=$1 AND signature=$2 AND category=$3
+                """)
+                prepare(cursor, 'votes_insert', """
+                INSERT INTO hugo.votes
+                    (client_ip, client_ua, person_id, signature, competition, category, votes)
+                    VALUES ('127.0.0.1','User Agent', $1, $2, 'Hugos', $3, $4::integer[])
+                """)
+            except Exception as err:
+                query_failed(err)
+            for (vote_key, rankings) in ballots:
+                ballot_count += 1
+                membership_id, first_name, last_name, normalised_category = vote_key
+                with stats.stage('probe'):
+                    try:
+                        cursor.execute('EXECUTE votes_probe (%s, %s, %s)', (
+                            membership_id, f"{first_name} {last_name}", normalised_category
+                        ))
+                    except Exception as err:
+                        query_failed(err)
+                    existing = cursor.fetchone()
+                if existing is None:
+                    with stats.stage('insert'):
+                        try:
+                            cursor.execute('EXECUTE votes_insert (%s, %s, %s, %s)', (
+                                membership_id, f"{first_name} {last_name}", normalised_category, rankings
+                            ))
+                        except Exception as err:
+                            query_failed(err)
+                    additions += 1
+            with stats.stage('commit'):
+                kansa_dbconn.commit()
+            cursor.close()
+        stats.count('inserted', additions)
+        stats.count('skipped', ballot_count - additions)
+        return additions
+
+    def insert_votes_bulk(self, ballots, dbconn=None):
+        # Stream every ballot into a staging table with COPY, then insert the ones kansa doesn't
+        # already have with a single anti-join.
+        from .db import query_failed
+        kansa_dbconn = dbconn or self.dbconn
+        stats = self.stats
+        with kansa_dbconn.cursor() as cursor:
+            with stats.stage('load'):
+                query = """
+                CREATE TEMPORARY TABLE votes_import ON COMMIT DROP AS
+                    SELECT 0 AS ord, person_id, signature, category, votes FROM hugo.votes WITH NO DATA
+                """
+                try:
+                    cursor.execute(query)
+                except Exception as err:
+                    query_failed(err)
+                # Numbered as they are copied: the next number afterwards is the number of ballots
+                positions = count()
+                rows = (
+                    (next(positions), membership_id, f"{first_name} {last_name}", normalised_category, rankings)
+                    for (membership_id, first_name, last_name, normalised_category), rankings in ballots
+                )
+                try:
+                    cursor.copy_expert(
+                        'COPY votes_import (ord, person_id, signature, category, votes) FROM STDIN', CopyRows(rows)
+                    )
+                except Exception as err:
+                    query_failed(err)
+            query = """
+            INSERT INTO hugo.votes
+                (client_ip, client_ua, person_id, signature, competition, category, votes)
+                SELECT '127.0.0.1', 'User Agent', person_id, signature, 'Hugos', category, votes
+                    FROM (
+                        SELECT DISTINCT ON (person_id, signature, category) *
+                            FROM votes_import
+                            ORDER BY person_id, signature, category, ord
+                    ) AS import
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM hugo.votes AS existing
+                            WHERE existing.client_ip='127.0.0.1' AND existing.client_ua='User Agent'
+                                AND existing.competition='Hugos' AND existing.person_id=import.person_id
+                                AND existing.signature=import.signature AND existing.category=import.category
+                    )
+                    ORDER BY ord
+            """
+            with stats.stage('merge'):
+                try:
+                    cursor.execute(query)
+                except Exception as err:
+                    query_failed(err)
+            additions = cursor.rowcount
+            with stats.stage('commit'):
+                kansa_dbconn.commit()
+            cursor.close()
+        stats.count('inserted', additions)
+        stats.count('skipped', next(positions) - additions)
+        return additions
@@ -1,7 +1,15 @@
 #! /usr/bin/env python
 
+import argparse
+import configparser
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-import subprocess
+from requests.adapters import HTTPAdapter
+
+from hugo_import.results import write_results
 
 categories = (
     'Novel', 'Novella', 'Novelette', 'ShortStory',
@@ -11,20 +19,48 @@ categories = (
     "FanWriter", "FanArtist", "Series", "Lodestar", "Astounding"
 )
 
-login = requests.get('https://local.hugo-nominations.tocotox.org/api/login?email=hugo-admin@example.com&key=key')
-login_cookie_jar = login.cookies
 
-for category in categories:
-    results_json = requests.get(
-        f'https://local.hugo-nominations.tocotox.org/api/hugo/admin/votes/{category}',
-        cookies=login_cookie_jar
-    )
-    with open(f'results/{category}.json', 'w') as filehandle:
+def open_session(base_url, email, key, workers):
+    # One session for every request, with enough pooled keep-alive connections for the workers
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    login = session.get(f'{base_url}/api/login', params={'email': email, 'key': key})
+    login.raise_for_status()
+    return session
+
+
+def pull_category(session, base_url, output_dir, category):
+    results_json = session.get(f'{base_url}/api/hugo/admin/votes/{category}')
+    results_json.raise_for_status()
+    with open(os.path.join(output_dir, f'{category}.json'), 'w') as filehandle:
         filehandle.write(results_json.text)
-    with open(f'results/{category}.json', 'r') as json_filehandle:
-        with open(f'results/{category}.csv', 'w') as csv_filehandle:
-            subprocess.run(
-                ['python', 'results_from_json.py'],
-                stdin=json_filehandle,
-                stdout=csv_filehandle
-            )
+    with open(os.path.join(output_dir, f'{category}.csv'), 'w', newline='') as csv_filehandle:
+        write_results(json.loads(results_json.text), csv_filehandle)
+    return category
+
+
+def pull_results(base_url, email, key, output_dir='results', workers=len(categories)):
+    os.makedirs(output_dir, exist_ok=True)
+    session = open_session(base_url, email, key, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(pull_category, session, base_url, output_dir, category) for category in categories]
+        return [future.result() for future in futures]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fetch the Hugo results from kansa and convert them to CSV.')
+    parser.add_argument('--config', default='config.ini', help='configuration file (default: config.ini)')
+    parser.add_argument('--workers', type=int, help='number of categories to fetch at once')
+    args = parser.parse_args()
+    config = configparser.ConfigParser()
+    config.read(args.config)
+    params = config['results'] if config.has_section('results') else {}
+    pull_results(
+        params.get('base_url', 'https://local.hugo-nominations.tocotox.org'),
+        params.get('email', 'hugo-admin@example.com'),
+        params.get('key', 'key'),
+        params.get('output_dir', 'results'),
+        args.workers or int(params.get('workers', len(categories))),
+    )
@@ -0,0 +1,44 @@
+import configparser
+
+import pytest
+
+from hugo_import.batch import job_files, run_batch
+
+
+def write_config(path, sections):
+    config = configparser.ConfigParser()
+    config.read_dict(sections)
+    with open(path, 'w') as fh:
+        config.write(fh)
+    return str(path)
+
+
+def test_unnamed_files_are_per_job(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = configparser.ConfigParser()
+    config.read_dict({'sync': {'incremental': 'yes'}, 'canonical': {'enabled': 'yes'}})
+    assert job_files('discon3', 'discon', config) == [
+        str(tmp_path / 'discon3-sync_state.json'), str(tmp_path / 'discon3-canonical.csv'),
+    ]
+    assert config['snapshot']['filename'] == 'discon3-discon3.sqlite'
+
+
+def test_named_files_are_kept_and_only_used_ones_returned(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = configparser.ConfigParser()
+    config.read_dict({'sync': {'incremental': 'yes', 'state_file': 'state.json'}})
+    # A votes import keeps no checkpoint
+    assert job_files('votes', 'votes_file', config) == []
+    assert job_files('nominations', 'discon', config) == [str(tmp_path / 'state.json')]
+
+
+def test_batch_refuses_jobs_sharing_a_checkpoint(tmp_path, capsys):
+    shared = {'sync': {'incremental': 'yes', 'state_file': str(tmp_path / 'state.json')}}
+    batch = write_config(tmp_path / 'batch.ini', {
+        'batch': {'summary_dir': str(tmp_path / 'summaries')},
+        'first': {'importer': 'discon', 'config': write_config(tmp_path / 'first.ini', shared)},
+        'second': {'importer': 'discon', 'config': write_config(tmp_path / 'second.ini', shared)},
+    })
+    with pytest.raises(SystemExit):
+        run_batch(batch)
+    assert f"second: {tmp_path / 'state.json'} is also used by first" in capsys.readouterr().out
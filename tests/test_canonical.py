@@ -0,0 +1,32 @@
+import random
+from fractions import Fraction
+
+from hugo_import.canonical import UnionFind, cluster_keys, trigrams
+
+
+def brute_force(keys, threshold):
+    grams = [trigrams(key) for key in keys]
+    clusters = UnionFind(len(keys))
+    threshold = Fraction(str(threshold))
+    for a in range(len(keys)):
+        for b in range(a):
+            if Fraction(len(grams[a] & grams[b]), len(grams[a] | grams[b])) >= threshold:
+                clusters.union(a, b)
+    return [clusters.find(index) for index in range(len(keys))]
+
+
+def test_similarity_exactly_at_threshold_merges():
+    # 4 shared trigrams of 7 + 7: a Jaccard similarity of exactly 0.4
+    assert cluster_keys(['aabbbc', 'aabdbc'], 0.4) == [0, 0]
+    assert cluster_keys(['aabbbc', 'aabdbc'], 0.41) == [0, 1]
+
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(500):
+        threshold = rng.choice((0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.9, 1.0))
+        keys = list(dict.fromkeys(
+            ''.join(rng.choice('abcd ') for _ in range(rng.randint(1, 9))).strip() or 'x'
+            for _ in range(rng.randint(2, 30))
+        ))
+        assert cluster_keys(keys, threshold) == brute_force(keys, threshold)
@@ -0,0 +1,22 @@
+import json
+import os
+
+from hugo_import.categories import CATEGORY_ALIASES, CATEGORY_DEFINITIONS, load_categories
+
+SCHEMAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schemas')
+
+
+def test_discon3_schema_matches_the_built_in_registry():
+    with open(os.path.join(SCHEMAS, 'discon3.json')) as fh:
+        schema = json.load(fh)
+    assert [
+        (category['name'], category['code'], tuple(category['fields'])) for category in schema['categories']
+    ] == list(CATEGORY_DEFINITIONS)
+    assert schema['aliases'] == CATEGORY_ALIASES
+
+
+def test_discon3_schema_loads():
+    categories = load_categories(os.path.join(SCHEMAS, 'discon3.json'))
+    assert len(categories) == len(CATEGORY_DEFINITIONS)
+    for alias, name in CATEGORY_ALIASES.items():
+        assert categories[alias] is categories[name]
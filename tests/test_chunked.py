@@ -0,0 +1,84 @@
+import csv
+import mmap
+
+import pytest
+
+from hugo_import import chunked
+from hugo_import.categories import CATEGORIES
+from hugo_import.nominations_file import NominationsFileTranslator
+
+HEADER = (
+    'users.current_sign_in_ip,users.last_sign_in_ip,users.current_sign_in_at,users.last_sign_in_at,'
+    'contact.updated_at,users.created_at,contact.created_at,nominations.created_at,'
+    'reservations.membership_number,users.email,users.sign_in_count,contact.preferred_first_name,'
+    'contact.preferred_last_name,contact.title,contact.first_name,contact.last_name,categories.name,'
+    'nominations.field_1,nominations.field_2,nominations.field_3'
+)
+
+TITLES = [
+    'Plain title',
+    'A title\nover two lines',
+    'She said ""hello""',
+    '"Quoted", with a comma',
+    '""\n""',
+    'Ends with a quote "',
+    'Three\r\nlines\nhere',
+    '',
+]
+
+
+@pytest.fixture
+def export(tmp_path):
+    # Every field is quoted so that the doubled quotes and embedded line breaks sit all through the
+    # file, around wherever a chunk boundary might first land
+    filename = tmp_path / 'nominations.csv'
+    with open(filename, 'w', newline='') as fh:
+        fh.write(HEADER + '\r\n')
+        writer = csv.writer(fh, quoting=csv.QUOTE_ALL)
+        for n in range(40):
+            title = TITLES[n % len(TITLES)]
+            writer.writerow([
+                '10.0.0.1', '', '2021-02-04 16:14:53 UTC', '', '', '', '', '', str(100 + n % 7), '', '', '', '',
+                f'First {n % 7}', f'Last\n{n % 7}', 'Best Novel' if n % 3 else 'Best Fanzine',
+                title, f'Author "{n}"', f'Publisher\n{title}',
+            ])
+    return str(filename)
+
+
+def csv_engine(filename):
+    translator = NominationsFileTranslator()
+    return {
+        key: (group.category.code, group.values)
+        for key, group in translator.group_nominations(translator.read_nominations(filename)).items()
+    }
+
+
+def merged_chunks(filename, chunks):
+    # group_nominations' merge, with the chunks grouped in this process
+    with open(filename, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        boundaries = chunked.chunk_boundaries(mapped, chunks)
+        size = len(mapped)
+    assert boundaries[0][0] == len(HEADER) + 2
+    assert boundaries[-1][1] == size
+    assert all(end == start for (_, end), (start, _) in zip(boundaries, boundaries[1:]))
+    grouped = {}
+    rows = 0
+    for start, end in boundaries:
+        groups, chunk_rows = chunked.group_chunk(CATEGORIES, filename, start, end)
+        rows += chunk_rows
+        for key, values in groups:
+            grouped.setdefault(key, (key[5], []))[1].extend(values)
+    return grouped, rows
+
+
+@pytest.mark.parametrize('chunks', [1, 2, 3, 7, 40, 1000])
+def test_chunks_group_as_the_csv_engine(export, chunks):
+    grouped, rows = merged_chunks(export, chunks)
+    assert rows == 40
+    assert grouped == csv_engine(export)
+
+
+def test_parallel_engine_groups_as_the_csv_engine(export):
+    nominations_list, rows = chunked.group_nominations(CATEGORIES, export, processes=2)
+    assert rows == 40
+    assert {key: (group.category.code, group.values) for key, group in nominations_list.items()} == csv_engine(export)
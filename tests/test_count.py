@@ -0,0 +1,92 @@
+from hugo_import.count import count_final_ballots, count_nominations, instant_runoff
+from hugo_import.normalise import NO_AWARD_ID
+
+NAMES = {1: 'A', 2: 'B', 3: 'C', 4: 'D'}
+
+
+def test_majority_wins_in_the_first_round():
+    winner, rounds = instant_runoff([(1,), (2,), (3,)], [3, 1, 1], {1, 2, 3})
+    assert winner == 1
+    assert rounds == [({1: 3, 2: 1, 3: 1}, [])]
+
+
+def test_last_place_tie_goes_against_fewer_first_round_votes():
+    # After D's ballot moves to C, B and C are level; C had fewer first-round votes
+    winner, rounds = instant_runoff([(1,), (2,), (3,), (4, 3)], [4, 3, 2, 1], {1, 2, 3, 4})
+    assert winner == 1
+    assert rounds == [
+        ({1: 4, 2: 3, 3: 2, 4: 1}, [4]),
+        ({1: 4, 2: 3, 3: 3}, [3]),
+        ({1: 4, 2: 3}, []),
+    ]
+
+
+def test_finalists_level_from_the_first_round_are_eliminated_together():
+    winner, rounds = instant_runoff([(1,), (2,), (3,), (4,)], [5, 3, 1, 1], {1, 2, 3, 4})
+    assert winner == 1
+    assert sorted(rounds[0][1]) == [3, 4]
+    assert rounds[1] == ({1: 5, 2: 3}, [])
+
+
+def test_no_award_takes_the_place_from_the_runoff_winner():
+    # A wins the instant runoff, but 5 ballots put No Award above A and only 4 the reverse
+    rankings = [[1]] * 4 + [[2, NO_AWARD_ID]] * 3 + [[NO_AWARD_ID]] * 2
+    counts = count_final_ballots(rankings, NAMES)
+    assert [count['winner'] for count in counts] == ['No award', 'A']
+    assert counts[0]['runoff'] == {'finalist': 'A', 'wins': 4, 'losses': 5}
+    # No Award has placed, so A takes second place despite losing the same test
+    assert counts[1]['runoff'] == {'finalist': 'A', 'wins': 4, 'losses': 5}
+
+
+def test_count_ends_once_no_award_has_placed():
+    rankings = [[1, NO_AWARD_ID]] * 3 + [[2, NO_AWARD_ID]] + [[NO_AWARD_ID]] * 5
+    counts = count_final_ballots(rankings, NAMES)
+    assert [count['winner'] for count in counts] == ['No award', 'A']
+    assert counts[0]['runoff'] == {'finalist': 'No award', 'wins': 0, 'losses': 0}
+    assert counts[1]['runoff'] == {'finalist': 'A', 'wins': 3, 'losses': 6}
+
+
+def test_selection_takes_two_lowest_and_eliminates_fewest_ballots():
+    # C (2 points, 2 ballots) goes before D (1.5 points, 3 ballots); then D before B
+    nominations = [{1}] * 6 + [{2}] * 5 + [{3}] * 2 + [{4, 1}] * 3
+    result = count_nominations(nominations, NAMES, finalists=2)
+    assert [round['eliminated'] for round in result['rounds']] == [['C'], ['D'], []]
+    assert result['rounds'][0]['tally'] == [
+        {'finalist': 'A', 'points': 7.5, 'nominations': 9},
+        {'finalist': 'B', 'points': 5, 'nominations': 5},
+        {'finalist': 'C', 'points': 2, 'nominations': 2},
+        {'finalist': 'D', 'points': 1.5, 'nominations': 3},
+    ]
+    assert result['rounds'][-1]['tally'] == [
+        {'finalist': 'A', 'points': 9, 'nominations': 9},
+        {'finalist': 'B', 'points': 5, 'nominations': 5},
+    ]
+    assert result['finalists'] == ['A', 'B']
+
+
+def test_tie_for_lowest_points_selects_only_the_tied():
+    # B, C and D share the lowest total; B, on the fewest ballots, goes alone and the count stops
+    nominations = [{1}] * 10 + [{2}] * 3 + [{3, 4}] * 6
+    result = count_nominations(nominations, NAMES, finalists=3)
+    assert [round['eliminated'] for round in result['rounds']] == [['B'], []]
+    assert result['finalists'] == ['A', 'C', 'D']
+
+
+def test_nominees_tied_on_points_and_ballots_go_together():
+    nominations = [{1}] * 10 + [{4}] * 5 + [{2}] * 2 + [{3}] * 2
+    result = count_nominations(nominations, NAMES, finalists=2)
+    assert [sorted(round['eliminated']) for round in result['rounds']] == [['B', 'C'], []]
+    assert result['finalists'] == ['A', 'D']
+
+
+def test_tied_elimination_that_would_leave_too_few_finalists_is_not_made():
+    nominations = [{1}] * 10 + [{4}] * 5 + [{2}] * 2 + [{3}] * 2
+    result = count_nominations(nominations, NAMES, finalists=3)
+    assert [round['eliminated'] for round in result['rounds']] == [[]]
+    assert result['finalists'] == ['A', 'D', 'B', 'C']
+
+
+def test_fewer_nominees_than_finalists_are_all_finalists():
+    result = count_nominations([{1, 2}, {2}], NAMES)
+    assert len(result['rounds']) == 1
+    assert result['finalists'] == ['B', 'A']
@@ -0,0 +1,54 @@
+from hugo_import.diff import diff_hashed, diff_keys
+
+
+def key(time, person, category='Novel'):
+    return (time, '127.0.0.1', person, f'Member {person}', category)
+
+
+def test_keys_are_new_unchanged_or_conflicting():
+    keys = [(key('10:00', 1), 'Novel', ['a']), (key('10:00', 2), 'Novel', ['b']), (key('10:00', 3), 'Novel', ['c'])]
+    existing = [(key('10:00', 2), ['b']), (key('10:00', 3), ['old'])]
+    assert diff_keys(keys, existing) == {'Novel': {'new': 1, 'unchanged': 1, 'conflicting': 1}}
+
+
+def test_hashed_changes_under_an_existing_key_are_superseded():
+    keys = [
+        (key('10:00', 1), 'Novel', ['a'], b'a'),
+        (key('10:00', 2), 'Novel', ['b'], b'b'),
+        (key('10:00', 3), 'Novel', ['c'], b'c'),
+    ]
+    existing = [(key('10:00', 2), ['b']), (key('10:00', 3), ['old'])]
+    assert diff_hashed(keys, {}, existing) == {'Novel': {'new': 1, 'unchanged': 1, 'superseded': 1}}
+
+
+def test_hashed_skips_unchanged_hashes_under_new_keys():
+    # Member 1 signed in again: a new key, but the same ballot as the recorded hash
+    keys = [(key('11:00', 1), 'Novel', ['a'], b'a'), (key('11:00', 2), 'Novel', ['b2'], b'b2')]
+    known = {(1, 'Novel'): b'a', (2, 'Novel'): b'b'}
+    existing = [(key('10:00', 1), ['a']), (key('10:00', 2), ['b'])]
+    assert diff_hashed(keys, known, existing) == {'Novel': {'unchanged': 1, 'new': 1}}
+
+
+def test_hashed_only_writes_each_members_latest_ballot():
+    keys = [
+        (key('12:00', 1), 'Novel', ['late'], b'late'),
+        (key('10:00', 1), 'Novel', ['early'], b'early'),
+        (key('10:00', 1, 'Fanzine'), 'Fanzine', ['x'], b'x'),
+        (key('10:00', 1, 'Fanzine'), 'Fanzine', ['y'], b'y'),
+    ]
+    assert diff_hashed(keys, {}, []) == {'Novel': {'new': 1, 'skipped': 1}, 'Fanzine': {'new': 1, 'skipped': 1}}
+
+
+def test_hashed_compares_with_the_newest_row_under_a_key():
+    keys = [(key('10:00', 1), 'Novel', ['b'], b'b')]
+    existing = [(key('10:00', 1), ['a']), (key('10:00', 1), ['b'])]
+    assert diff_hashed(keys, {}, existing) == {'Novel': {'unchanged': 1}}
+
+
+def test_hashed_skips_a_second_contacts_key_at_the_same_time():
+    # Same member, category and time, but another contact's name: only the later key is written
+    keys = [
+        (('10:00', '127.0.0.1', 1, 'First Contact', 'Novel'), 'Novel', ['a'], b'a'),
+        (('10:00', '127.0.0.1', 1, 'Second Contact', 'Novel'), 'Novel', ['a'], b'a'),
+    ]
+    assert diff_hashed(keys, {}, []) == {'Novel': {'new': 1, 'skipped': 1}}
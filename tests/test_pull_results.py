@@ -0,0 +1,69 @@
+import csv
+import json
+import os
+import threading
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+from benchmarks.results_server import start_server  # noqa: E402
+from pull_results_json import categories, pull_results  # noqa: E402
+from hugo_import.results import render_results  # noqa: E402
+
+
+def canned_results(category):
+    # A small two-place count, named after the category so every file written is distinct
+    first, second = f'{category} Finalist 1', f'{category} Finalist 2'
+    return [
+        {
+            'place': 1,
+            'rounds': [
+                {'tally': [
+                    {'finalist': first, 'votes': 30}, {'finalist': second, 'votes': 25},
+                    {'finalist': 'No award', 'votes': 5},
+                ]},
+                {'tally': [{'finalist': first, 'votes': 33}, {'finalist': second, 'votes': 27}]},
+            ],
+            'winner': first,
+            'runoff': {'wins': 52, 'losses': 8},
+        },
+        {
+            'place': 2,
+            'rounds': [{'tally': [{'finalist': second, 'votes': 50}, {'finalist': 'No award', 'votes': 10}]}],
+            'winner': second,
+            'runoff': {'wins': 50, 'losses': 10},
+        },
+    ]
+
+
+@pytest.fixture
+def results_server():
+    server = start_server(results=canned_results)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_pull_writes_json_and_csv_per_category(results_server, tmp_path):
+    pulled = pull_results(results_server, 'hugo-admin@example.com', 'key', str(tmp_path), workers=4)
+    assert pulled == list(categories)
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        f'{category}.{extension}' for category in categories for extension in ('json', 'csv')
+    )
+    for category in categories:
+        expected = canned_results(category)
+        with open(tmp_path / f'{category}.json') as fh:
+            assert json.load(fh) == expected
+        with open(tmp_path / f'{category}.csv', newline='') as fh:
+            rows = list(csv.reader(fh))
+        assert rows == [[str(cell) for cell in row] for row in render_results(expected)]
+        assert rows[0][:3] == ['Race for position', 'Finalist', 'Round 1']
+        assert rows[0][-1] == 'Runoff'
+
+
+def test_pull_fails_on_rejected_request(results_server, tmp_path):
+    with pytest.raises(requests.HTTPError):
+        pull_results(results_server + '/missing', 'hugo-admin@example.com', 'key', str(tmp_path), workers=2)
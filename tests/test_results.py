@@ -0,0 +1,70 @@
+import io
+
+from hugo_import.results import write_results
+
+SHORT_COUNTS = [
+    {
+        'place': 1,
+        'winner': 'A',
+        'rounds': [
+            {'tally': [
+                {'finalist': 'A', 'votes': 3}, {'finalist': 'B', 'votes': 2}, {'finalist': 'No award', 'votes': 1},
+            ]},
+            {'tally': [{'finalist': 'A', 'votes': 4}, {'finalist': 'B', 'votes': 2}]},
+        ],
+        'runoff': {'wins': 5, 'losses': 1},
+    },
+    {
+        'place': 2,
+        'winner': 'B',
+        'rounds': [{'tally': [{'finalist': 'B', 'votes': 4}, {'finalist': 'No award', 'votes': 2}]}],
+        'runoff': {'wins': 4, 'losses': 2},
+    },
+]
+
+# What the original results_from_json.py wrote for SHORT_COUNTS
+BASELINE_CSV = (
+    'Race for position,Finalist,Round 1,Round 2,Round 3,Round 4,Round 5,Round 6,Runoff\r\n'
+    '1,A,3,4,,,,,5\r\n'
+    '1,B,2,2,,,,,0\r\n'
+    '1,No award,1,,,,,,1\r\n'
+    ',,,,,,,,\r\n'
+    '2,B,4,,,,,,4\r\n'
+    '2,No award,2,,,,,,2\r\n'
+    ',,,,,,,,\r\n'
+)
+
+
+def render(vote_data):
+    output = io.StringIO()
+    write_results(vote_data, output)
+    return output.getvalue()
+
+
+def test_short_counts_keep_six_round_layout():
+    assert render(SHORT_COUNTS) == BASELINE_CSV
+
+
+def test_no_counts_write_only_the_heading():
+    assert render([]) == BASELINE_CSV.split('\n')[0] + '\n'
+
+
+def test_long_count_widens_layout():
+    rounds = [{'tally': [{'finalist': 'A', 'votes': n}, {'finalist': 'B', 'votes': 1}]} for n in range(1, 8)]
+    rows = render([{'place': 1, 'winner': 'A', 'rounds': rounds, 'runoff': {'wins': 7, 'losses': 0}}]).splitlines()
+    assert rows[0].split(',')[-2:] == ['Round 7', 'Runoff']
+    assert rows[1] == '1,A,1,2,3,4,5,6,7,7'
+    assert rows[2] == '1,B,1,1,1,1,1,1,1,0'
+
+
+def test_runoff_finalist_leads_when_no_award_takes_the_place():
+    # A won the instant runoff but lost the No Award test, so No Award is the declared winner
+    rounds = [
+        {'tally': [{'finalist': 'B', 'votes': 2}, {'finalist': 'A', 'votes': 3}, {'finalist': 'No award', 'votes': 1}]},
+        {'tally': [{'finalist': 'B', 'votes': 2}, {'finalist': 'A', 'votes': 4}]},
+    ]
+    rows = render([{
+        'place': 1, 'winner': 'No award', 'rounds': rounds,
+        'runoff': {'finalist': 'A', 'wins': 2, 'losses': 4},
+    }]).splitlines()
+    assert rows[1:4] == ['1,A,3,4,,,,,2', '1,B,2,2,,,,,0', '1,No award,1,,,,,,4']
@@ -0,0 +1,37 @@
+import configparser
+import sqlite3
+
+import pytest
+
+from hugo_import.nominations_file import NominationsFileTranslator
+from hugo_import.snapshot import Snapshot
+
+
+def test_reading_a_missing_snapshot_creates_nothing(tmp_path):
+    filename = tmp_path / 'discon3.sqlite'
+    with pytest.raises(sqlite3.OperationalError):
+        Snapshot(str(filename), read_only=True)
+    assert not filename.exists()
+
+
+def test_import_from_a_missing_snapshot_exits(tmp_path, capsys):
+    filename = tmp_path / 'discon3.sqlite'
+    translator = NominationsFileTranslator()
+    translator.config = configparser.ConfigParser()
+    translator.config.read_dict({'snapshot': {'enabled': 'yes', 'filename': str(filename)}})
+    with pytest.raises(SystemExit):
+        translator.load_nominations('nominations.csv')
+    assert 'refresh it with main.py --snapshot' in capsys.readouterr().out
+    assert not filename.exists()
+
+
+def test_read_only_snapshot_reads_a_refreshed_one(tmp_path):
+    filename = str(tmp_path / 'discon3.sqlite')
+    Snapshot(filename).close()
+    snapshot = Snapshot(filename, read_only=True)
+    try:
+        assert list(snapshot.rows()) == []
+        with pytest.raises(sqlite3.OperationalError):
+            snapshot.dbconn.execute('DELETE FROM nominations')
+    finally:
+        snapshot.close()